@@ -0,0 +1,185 @@
+# archiver.py
+import csv
+import os
+import re
+import shutil
+import sqlite3
+import sys
+import threading
+import time
+import zipfile
+from datetime import datetime
+from ledger.log import log_event
+from retry_queue import RetryQueue
+from settings import (WARCH_DIR, LOG_PATH, ARCHIVE_DIR, ARCHIVE_INDEX_PATH, ARCHIVE_RETENTION_DAYS,
+                      ARCHIVE_INTERVAL, ARCHIVE_ENABLED)
+
+# 作业文件夹名：f"{TIMESTAMP} {文件名}"，TIMESTAMP 为 %Y%m%d-%H%M。
+# TIMESTAMP 是程序启动时的时间，不是作业日期，归档日期以文件夹的最后修改时间为准
+_JOB_FOLDER_RE = re.compile(r"^\d{8}-\d{4} (.+)$")
+
+
+class JobArchiver:
+    def __init__(self, watch_dir=WARCH_DIR, archive_dir=ARCHIVE_DIR, index_path=ARCHIVE_INDEX_PATH,
+                 retention_days=ARCHIVE_RETENTION_DAYS):
+        """
+        把监视文件夹中超过保留期的作业文件夹压缩到 archive_dir/年/月/日/<文件夹名>.zip 并删除原文件夹
+        （年/月/日为文件夹的最后修改日期），
+        让监视文件夹保持精简（轮询和 Box 同步都更快）。归档记录写入 SQLite 索引，可按文件名或 L6 名称查找。
+        仍在重试队列中的作业文件夹不归档。
+
+        参数:
+            watch_dir (str): 监视文件夹（作业文件夹所在处）
+            archive_dir (str): 归档文件夹（应位于监视文件夹之外）
+            index_path (str): 索引数据库路径
+            retention_days (float): 作业文件夹最后修改后保留的天数
+        """
+        self.watch_dir = watch_dir
+        self.archive_dir = archive_dir
+        self.index_path = index_path
+        self.retention_days = retention_days
+
+    def archive_completed_jobs(self):
+        """
+        归档全部超过保留期的作业文件夹
+
+        返回:
+            list[str]: 生成的归档文件路径
+        """
+        cutoff = time.time() - self.retention_days * 86400
+        pending = {os.path.normcase(os.path.abspath(p)) for p in RetryQueue().folders()}
+        names = None
+        archived = []
+
+        for folder_name in sorted(os.listdir(self.watch_dir)):
+            folder_path = os.path.join(self.watch_dir, folder_name)
+            match = _JOB_FOLDER_RE.match(folder_name)
+            if not match or not os.path.isdir(folder_path):
+                continue
+            if os.path.normcase(os.path.abspath(folder_path)) in pending:
+                continue
+            last = _last_modified(folder_path)
+            if last > cutoff:
+                continue
+
+            if names is None:
+                names = _names_from_log(LOG_PATH)  # 只在确实有文件夹要归档时读取日志
+            file_name = match.group(1)
+            job_day = datetime.fromtimestamp(last)
+            try:
+                archive_path = self._archive_folder(folder_path, os.path.join(
+                    self.archive_dir, job_day.strftime("%Y"), job_day.strftime("%m"), job_day.strftime("%d")))
+                self._index(folder_name, file_name, names.get(os.path.normcase(folder_path), ""),
+                            job_day.strftime("%Y-%m-%d"), archive_path)
+                shutil.rmtree(folder_path)
+            except (OSError, zipfile.BadZipFile, sqlite3.Error) as e:
+                print(f"⚠️ 归档失败 {folder_name}: {e}")
+                log_event(LOG_PATH, "archive_failed", f"folder={folder_name} error={e}")
+                continue
+            archived.append(archive_path)
+
+        if archived:
+            log_event(LOG_PATH, "archive", f"folders={len(archived)}")
+            print(f"🗄️ 已归档 {len(archived)} 个作业文件夹")
+        return archived
+
+    def find(self, query):
+        """
+        按文件名或 L6 名称（部分匹配）查找归档
+
+        返回:
+            list[dict]: 匹配的归档记录，包含 folder_name、file_name、l6_name、job_date、archive_path
+        """
+        if not os.path.exists(self.index_path):
+            return []
+        pattern = f"%{query}%"
+        with sqlite3.connect(self.index_path) as conn:
+            conn.row_factory = sqlite3.Row
+            rows = conn.execute(
+                "SELECT folder_name, file_name, l6_name, job_date, archive_path FROM archived_jobs "
+                "WHERE file_name LIKE ? OR l6_name LIKE ? ORDER BY job_date DESC", (pattern, pattern)).fetchall()
+        return [dict(row) for row in rows]
+
+    def _archive_folder(self, folder_path, target_dir):
+        """压缩到临时文件，完成后再改名，避免中途失败留下不完整的归档"""
+        os.makedirs(target_dir, exist_ok=True)
+        folder_name = os.path.basename(folder_path)
+        archive_path = os.path.join(target_dir, f"{folder_name}.zip")
+        tmp_path = archive_path + ".tmp"
+        with zipfile.ZipFile(tmp_path, "w", zipfile.ZIP_DEFLATED) as zf:
+            for root, _, files in os.walk(folder_path):
+                for file in files:
+                    path = os.path.join(root, file)
+                    zf.write(path, os.path.join(folder_name, os.path.relpath(path, folder_path)))
+        with zipfile.ZipFile(tmp_path) as zf:
+            bad = zf.testzip()
+            if bad:
+                raise zipfile.BadZipFile(f"校验失败: {bad}")
+        os.replace(tmp_path, archive_path)
+        return archive_path
+
+    def _index(self, folder_name, file_name, l6_name, job_date, archive_path):
+        os.makedirs(os.path.dirname(self.index_path) or ".", exist_ok=True)
+        with sqlite3.connect(self.index_path) as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS archived_jobs (folder_name TEXT PRIMARY KEY, file_name TEXT, "
+                "l6_name TEXT, job_date TEXT, archive_path TEXT, archived_at TEXT)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_archived_file ON archived_jobs (file_name)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_archived_l6 ON archived_jobs (l6_name)")
+            conn.execute(
+                "INSERT OR REPLACE INTO archived_jobs VALUES (?, ?, ?, ?, ?, ?)",
+                (folder_name, file_name, l6_name, job_date, archive_path,
+                 datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+
+
+def _last_modified(folder_path):
+    latest = os.path.getmtime(folder_path)
+    for root, _, files in os.walk(folder_path):
+        for file in files:
+            latest = max(latest, os.path.getmtime(os.path.join(root, file)))
+    return latest
+
+
+def _names_from_log(log_path):
+    """
+    从处理日志取得 {作业文件夹: L6 名称}（日志中 Name 列记录为 "['名称']"）
+    """
+    names = {}
+    if not os.path.isfile(log_path):
+        return names
+    with open(log_path, newline="", encoding="utf-8-sig") as f:
+        for row in csv.DictReader(f):
+            name = (row.get("Name") or "").strip("[]'\" ")
+            if name and row.get("FolderPath"):
+                names[os.path.normcase(row["FolderPath"])] = name
+    return names
+
+
+def start_archiver(interval=ARCHIVE_INTERVAL):
+    """
+    在后台线程中定期归档作业文件夹
+
+    返回:
+        threading.Thread | None: 归档线程（未启用时返回 None）
+    """
+    if not ARCHIVE_ENABLED:
+        return None
+
+    def _loop():
+        archiver = JobArchiver()
+        while True:
+            try:
+                archiver.archive_completed_jobs()
+            except Exception as e:
+                print(f"⚠️ 归档出错: {e}")
+            time.sleep(interval)
+
+    thread = threading.Thread(target=_loop, name="archiver", daemon=True)
+    thread.start()
+    return thread
+
+
+if __name__ == "__main__":
+    # 用法: python archiver.py <文件名或 L6 名称>
+    for record in JobArchiver().find(" ".join(sys.argv[1:])):
+        print(f"{record['job_date']}  {record['l6_name']}  {record['file_name']}  →  {record['archive_path']}")
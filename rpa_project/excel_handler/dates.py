@@ -0,0 +1,86 @@
+# dates.py
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from settings import DATE_CACHE_SIZE
+
+# 字符串日期可接受的格式（fast path 无法处理时依次尝试）
+DATE_FORMATS = ("%Y-%m-%d", "%Y%m%d", "%Y/%m/%d", "%Y.%m.%d")
+
+_EXCEL_EPOCH = datetime(1899, 12, 30)
+_MAX_EXCEL_SERIAL = 2958465  # 9999/12/31
+
+
+def to_yyyymmdd(value, numeric=False):
+    """
+    将单元格的原始值统一转为 'yyyymmdd' 字符串
+
+    支持 datetime/date、'yyyymmdd'、'yyyy-mm-dd'、'yyyy/mm/dd'、'yyyy.mm.dd' 字符串；
+    numeric 为 True 时（只用于已知的日期列）数值也按 8 位 yyyymmdd 或 Excel 日期序列值解析。
+    相同的原始值只解析一次（LRU 缓存）。
+
+    参数:
+        value: 单元格的原始值
+        numeric (bool): 是否把数值解析为日期；为 False 时数值返回 None
+
+    返回:
+        str | None: 'yyyymmdd'，无法识别时返回 None
+    """
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, datetime):
+        return f"{value.year:04d}{value.month:02d}{value.day:02d}"
+    try:
+        return _normalize_cached(value, numeric)
+    except TypeError:  # 不可哈希的值不走缓存
+        return _normalize(value, numeric)
+
+
+@lru_cache(maxsize=DATE_CACHE_SIZE)
+def _normalize_cached(value, numeric):
+    return _normalize(value, numeric)
+
+
+def _normalize(value, numeric):
+    if isinstance(value, date):
+        return f"{value.year:04d}{value.month:02d}{value.day:02d}"
+    if isinstance(value, (int, float)):
+        return _from_number(value) if numeric else None
+    if isinstance(value, str):
+        return _from_string(value.strip())
+    return None
+
+
+def _from_number(number):
+    # 8 位整数视为 yyyymmdd，其余视为 Excel 日期序列值
+    if float(number).is_integer() and 19000101 <= number <= 99991231:
+        return _checked(int(number) // 10000, int(number) // 100 % 100, int(number) % 100)
+    if 1 <= number <= _MAX_EXCEL_SERIAL:
+        d = _EXCEL_EPOCH + timedelta(days=int(number))
+        return f"{d.year:04d}{d.month:02d}{d.day:02d}"
+    return None
+
+
+def _from_string(text):
+    # fast path：yyyymmdd 与 yyyy-mm-dd / yyyy/mm/dd / yyyy.mm.dd
+    if len(text) == 8 and text.isdigit():
+        return _checked(int(text[:4]), int(text[4:6]), int(text[6:]))
+    if len(text) == 10 and text[4] == text[7] and text[4] in "-/." \
+            and text[:4].isdigit() and text[5:7].isdigit() and text[8:].isdigit():
+        return _checked(int(text[:4]), int(text[5:7]), int(text[8:]))
+
+    # 其余写法（例如 2025/1/5）交给 strptime
+    for fmt in DATE_FORMATS:
+        try:
+            d = datetime.strptime(text, fmt)
+        except ValueError:
+            continue
+        return f"{d.year:04d}{d.month:02d}{d.day:02d}"
+    return None
+
+
+def _checked(year, month, day):
+    try:
+        date(year, month, day)
+    except ValueError:
+        return None
+    return f"{year:04d}{month:02d}{day:02d}"
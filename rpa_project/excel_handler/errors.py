@@ -0,0 +1,115 @@
+# errors.py
+from openpyxl.utils import column_index_from_string
+
+
+class ErrorGroup:
+    """
+    一类校验错误的紧凑记录：单元格按列合并为连续区间（如 C5:C900），
+    其他错误只保留计数和前 N 个样例用于显示，完整内容通过 details() 获取。
+    """
+    __slots__ = ("name", "count", "samples", "sample_size", "_items", "_ranges")
+
+    def __init__(self, name, sample_size):
+        self.name = name
+        self.count = 0
+        self.samples = []
+        self.sample_size = sample_size
+        self._items = []
+        self._ranges = {}  # {列字母: [[起始行, 结束行], ...]}
+
+    def add(self, item):
+        self.count += 1
+        if len(self.samples) < self.sample_size:
+            self.samples.append(item)
+        self._items.append(item)
+
+    def add_cell(self, column, row):
+        self.count += 1
+        ranges = self._ranges.setdefault(column, [])
+        if ranges and ranges[-1][1] == row - 1:
+            ranges[-1][1] = row
+        else:
+            ranges.append([row, row])
+
+    def ranges(self):
+        """
+        返回:
+            list[str]: 按列排序的区间，例如 ["C5:C900", "D7"]
+        """
+        result = []
+        for column in sorted(self._ranges, key=column_index_from_string):
+            for start, end in self._ranges[column]:
+                result.append(f"{column}{start}" if start == end else f"{column}{start}:{column}{end}")
+        return result
+
+    def details(self):
+        """
+        返回全部错误（单元格区间展开为单个坐标）
+        """
+        cells = [
+            f"{column}{row}"
+            for column in sorted(self._ranges, key=column_index_from_string)
+            for start, end in self._ranges[column]
+            for row in range(start, end + 1)
+        ]
+        return cells + list(self._items)
+
+    def __len__(self):
+        return self.count
+
+    def __str__(self):
+        if self._ranges:
+            parts = self.ranges()
+            shown = " ".join(parts[:self.sample_size])
+            more = f" 等{len(parts)}处" if len(parts) > self.sample_size else ""
+        else:
+            shown = " ".join(str(s) for s in self.samples)
+            more = " 等" if self.count > len(self.samples) else ""
+        return f"{shown}{more}（共 {self.count} 个）"
+
+    __repr__ = __str__
+
+
+class ErrorAggregator:
+    def __init__(self, budget, sample_size=10):
+        """
+        按类别收集校验错误，错误总数达到 budget 后 exhausted 变为 True，调用方应停止检查。
+
+        参数:
+            budget (int): 错误总数上限
+            sample_size (int): 每类错误显示的样例数
+        """
+        self.budget = budget
+        self.sample_size = sample_size
+        self.total = 0
+        self.groups = {}
+
+    @property
+    def exhausted(self):
+        return self.total >= self.budget
+
+    def group(self, name):
+        if name not in self.groups:
+            self.groups[name] = ErrorGroup(name, self.sample_size)
+        return self.groups[name]
+
+    def add(self, name, item):
+        self.group(name).add(item)
+        self.total += 1
+
+    def add_cell(self, name, column, row):
+        self.group(name).add_cell(column, row)
+        self.total += 1
+
+    def details(self, name):
+        """
+        按需取得某类错误的完整列表
+        """
+        return self.groups[name].details() if name in self.groups else []
+
+    def to_dict(self):
+        """
+        返回:
+            dict[str, ErrorGroup]: 只包含有错误的类别，可直接并入 validate_excel_data 的 errors
+        """
+        return {name: group for name, group in self.groups.items() if group.count}
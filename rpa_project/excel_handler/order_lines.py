@@ -0,0 +1,113 @@
+# order_lines.py
+from openpyxl.utils import column_index_from_string
+from excel_handler.dates import to_yyyymmdd
+from excel_handler.utils import build_line_key
+from settings import ID_COLUMN, DATE_COLUMN, MAX_COL, KEY_COLUMNS_IN_A
+
+# 订单表中各字段所在的列
+SUPPLIER_COLUMN = "C"
+PRODUCT_COLUMN = "E"
+QUANTITY_COLUMN = "G"
+REMARKS_COLUMN = "K"
+
+
+def _text(value):
+    return None if value is None else str(value)
+
+
+class OrderLine:
+    """
+    订单表中的一行，各字段在读取时统一转换一次，供校验、生成上传数据和匹配发注番号共用
+
+    属性:
+        row (int): 当前工作表中的行号（已删除空行后的行号）
+        values (tuple): 该行 A 列起的原始值（用于空单元格检查和内容哈希）
+        supplier (str | None): 仕入先コード
+        warehouse (str | None): 入荷倉庫コード（配送可能日期表的 ID）
+        product (str | None): 商品コード
+        quantity (str | None): 発注数量
+        delivery_date (str | None): 納期（yyyymmdd），无法识别时为 None
+        remarks (str | None): 伝票摘要
+        key (str): 与発注番号 CSV 匹配用的 key
+    """
+    __slots__ = ("row", "values", "supplier", "warehouse", "product", "quantity", "delivery_date", "remarks", "key")
+
+    def __init__(self, row, values, supplier, warehouse, product, quantity, delivery_date, remarks, key):
+        self.row = row
+        self.values = values
+        self.supplier = supplier
+        self.warehouse = warehouse
+        self.product = product
+        self.quantity = quantity
+        self.delivery_date = delivery_date
+        self.remarks = remarks
+        self.key = key
+
+    @property
+    def raw_delivery_date(self):
+        return self.values[column_index_from_string(DATE_COLUMN) - 1]
+
+    def slash_delivery_date(self):
+        """
+        返回 'yyyy/mm/dd' 格式的納期（上传格式）；納期为空时返回 None
+
+        异常:
+            ValueError: 納期无法识别
+        """
+        if self.delivery_date is None:
+            if self.raw_delivery_date is None:
+                return None
+            raise ValueError(f"无法识别的日期: {self.raw_delivery_date}")
+        d = self.delivery_date
+        return f"{d[:4]}/{d[4:6]}/{d[6:]}"
+
+
+class OrderLineBatch:
+    def __init__(self, lines):
+        """
+        一个订单的全部数据行
+
+        参数:
+            lines (list[OrderLine]): 按行号排序的订单行
+        """
+        self.lines = lines
+
+    @classmethod
+    def from_sheet(cls, sheet, min_row, max_row):
+        """
+        一次遍历工作表的数据区，构建全部订单行
+
+        参数:
+            sheet (Worksheet): 订单工作表
+            min_row (int): 数据起始行
+            max_row (int): 数据结束行
+        """
+        columns = [SUPPLIER_COLUMN, ID_COLUMN, PRODUCT_COLUMN, QUANTITY_COLUMN, DATE_COLUMN, REMARKS_COLUMN]
+        idx = [column_index_from_string(col) - 1 for col in columns]
+        width = max([MAX_COL] + [i + 1 for i in idx] + [column_index_from_string(col) for col in KEY_COLUMNS_IN_A])
+        supplier_i, warehouse_i, product_i, quantity_i, date_i, remarks_i = idx
+
+        lines = []
+        if min_row is None or max_row < min_row:
+            return cls(lines)
+
+        rows = sheet.iter_rows(min_row=min_row, max_row=max_row, max_col=width, values_only=True)
+        for row, values in enumerate(rows, start=min_row):
+            lines.append(OrderLine(
+                row=row,
+                values=values,
+                supplier=_text(values[supplier_i]),
+                warehouse=_text(values[warehouse_i]),
+                product=_text(values[product_i]),
+                quantity=_text(values[quantity_i]),
+                delivery_date=to_yyyymmdd(values[date_i], numeric=True),
+                remarks=_text(values[remarks_i]),
+                key=build_line_key(values, KEY_COLUMNS_IN_A, DATE_COLUMN),
+            ))
+        return cls(lines)
+
+    def __iter__(self):
+        return iter(self.lines)
+
+    def __len__(self):
+        return len(self.lines)
@@ -1,24 +1,32 @@
 import os
-from datetime import datetime
+from io import BytesIO
 from openpyxl import load_workbook, Workbook
 from openpyxl.utils import column_index_from_string
-from excel_handler.utils import format_date
+from excel_handler.order_lines import OrderLineBatch
+from excel_handler.xlsx_patch import patch_xlsx_cells
 
 class ExcelProcessor:
-    def __init__(self, file_path):
+    def __init__(self, file_path, content=None):
         """
         初始化处理器
 
         参数:
             file_path (str): Excel 文件路径
+            content (bytes, optional): 已读取的文件内容；提供时直接解析这些字节，不再读取 file_path
         """
         self.file_path = file_path
-        self.workbook = load_workbook(file_path, data_only=True)
+        self.workbook = load_workbook(BytesIO(content) if content is not None else file_path, data_only=True)
         self.sheet = self.workbook[self.workbook.sheetnames[0]]
         self.workbook_name = os.path.basename(file_path)
         self.sheet_name = self.sheet.title
         self.min_row = None
         self.max_row = None
+        self.cell_updates = {}  # {(原文件行号, 列号): 值}，用于增量保存
+        self._deleted_row_batches = []
+        self.reference_version = None  # 校验时使用的参考数据版本
+        self.validation_errors = None  # 最近一次校验的 ErrorAggregator
+        self.upload_row_count = None  # 最近一次生成的上传数据行数
+        self._order_lines = None
 
     def has_multiple_sheets(self):
         """
@@ -121,25 +129,24 @@ class ExcelProcessor:
         
         for row in reversed(delete_rows):
             self.sheet.delete_rows(row)
+        if delete_rows:
+            self._deleted_row_batches.append(delete_rows)
+            self._order_lines = None  # 行号已变化，重新构建
         
         self.max_row = self.sheet.max_row
         return self.sheet.max_row, delete_rows
 
-    def find_empty_cells(self,min_col=3, max_col=11):
+    def order_lines(self):
         """
-        找出数据区域中 min_col~ max_col 列所有空单元格
+        返回数据区的订单行（首次调用时构建，删除空行后重新构建）
 
         返回:
-            list[str]: 所有空单元格的位置（例如 ["B5", "J9"]）
+            OrderLineBatch: 全部订单行
         """
-        self.get_min_max_row()
-        empty_cells = []
-        for row in self.sheet.iter_rows(min_row=self.min_row, max_row=self.max_row, min_col= min_col, max_col= max_col):  # B~F
-            for cell in row:
-                if cell.value is None or str(cell.value).strip() == "":
-                    empty_cells.append(cell.coordinate)
-
-        return empty_cells
+        if self._order_lines is None:
+            self.get_min_max_row()
+            self._order_lines = OrderLineBatch.from_sheet(self.sheet, self.min_row, self.max_row)
+        return self._order_lines
 
     def save_cleaned_sheet(self, output_path):
         """
@@ -167,118 +174,142 @@ class ExcelProcessor:
         """
         self.workbook.close()
 
-    def save(self, save_path: str = None):
+    def set_cell_value(self, row, column, value):
+        """
+        写入单元格，并记录到 cell_updates 供增量保存使用
+
+        参数:
+            row (int): 当前工作表中的行号（已删除空行后的行号）
+            column (int): 列号
+            value: 要写入的值
+        """
+        self.sheet.cell(row=row, column=column, value=value)
+        self.cell_updates[(self._original_row(row), column)] = value
+
+    def _original_row(self, row):
+        """
+        将删除空行后的行号换算回原文件中的行号
+        """
+        for batch in reversed(self._deleted_row_batches):
+            for deleted in batch:  # batch 为升序的删除前行号
+                if deleted <= row:
+                    row += 1
+        return row
+
+    def save(self, save_path: str = None, incremental: bool = True):
         """
-        保存当前工作簿到指定路径。如果未提供路径，则覆盖原文件。
+        保存当前工作簿到指定路径。如果未提供路径，则保存为同目录下的 NEW_ 文件。
+
+        直接复制原 xlsx 并只改写通过 set_cell_value 修改过的单元格（没有修改时原样复制），
+        保留原文件的格式与公式；原文件不是 xlsx 或增量保存失败时才用 openpyxl 整体保存。
 
         参数:
             save_path (str, optional): 要保存的路径。默认为初始化时的路径。
+            incremental (bool): 是否尝试增量保存
         """
         if save_path is None:
             original_filename = os.path.basename(self.file_path)
             directory = os.path.dirname(self.file_path)
             save_path = os.path.join(directory, f"NEW_{original_filename}")
 
+        if incremental and self.file_path.lower().endswith(".xlsx"):
+            try:
+                sheet_index = self.workbook.sheetnames.index(self.sheet_name)
+                patch_xlsx_cells(self.file_path, save_path, self.cell_updates, sheet_index)
+                return save_path
+            except Exception as e:
+                print(f"⚠️ 增量保存失败，改为整体保存: {e}")
+
         self.workbook.save(save_path)
+        return save_path
         
 
-    def get_column_dates_with_colD(self, date_column='H', id_column='D'):
+    def create_upload_data(self, save_dir,fill_values, skip_rows=None):
         """
-        获取指定列中的所有有效日期，并将其与 D 列的值配对为元组 (D值, 日期)
+        生成用于上传的 Excel 数据，只处理当前工作表。
 
         参数:
-            date_column (str): 日期所在列，例如 "H"
-            id_column (str): 需要配对的 ID 列，例如 "D"
+            save_dir (str): 输出文件夹路径
+            skip_rows (set[int], optional): 不上传的行号（例如已下单的行）
 
         返回:
-            list[tuple[str, str]]: 格式为 (D列的值, 格式化后的日期字符串)
+            str: 保存后的文件路径
         """
-        if self.min_row is None or self.max_row is None:
-            self.get_min_max_row(date_column)
-
-        date_col_idx = column_index_from_string(date_column)
-        id_col_idx = column_index_from_string(id_column)
-
-        results = []
-
-        for row in range(self.min_row, self.max_row + 1):
-            id_val = self.sheet.cell(row=row, column=id_col_idx).value
-            date_val = self.sheet.cell(row=row, column=date_col_idx).value
-
-            if isinstance(date_val, datetime):
-                date_str = date_val.strftime('%Y%m%d')
-            elif isinstance(date_val, str):
-                for fmt in ("%Y-%m-%d", "%Y%m%d", "%Y/%m/%d"):
-                    try:
-                        date_obj = datetime.strptime(date_val, fmt)
-                        date_str = date_obj.strftime('%Y%m%d')
-                        break
-                    except ValueError:
-                        continue
-                else:
-                    continue
-            else:
-                continue
+        os.makedirs(save_dir, exist_ok=True)
 
-            results.append((str(id_val), date_str))
+        wb_new = self._build_upload_workbook(fill_values, skip_rows)
 
-        return results
-    
-    def create_upload_data(self, save_dir,fill_values):
+        save_path = os.path.join(save_dir, "nagashikomi.xlsx")
+        wb_new.save(save_path)
+        return save_path
+
+    def create_upload_chunks(self, save_dir, fill_values, max_rows, skip_rows=None):
         """
-        生成用于上传的 Excel 数据，只处理当前工作表。
+        生成上传数据并按行数切分为多个文件，每个文件都带表头。
 
         参数:
             save_dir (str): 输出文件夹路径
+            fill_values (dict): 固定填充列
+            max_rows (int): 每个文件最多的数据行数
+            skip_rows (set[int], optional): 不上传的行号
 
         返回:
-            str: 保存后的文件路径
+            list[str]: 各分批文件路径（nagashikomi_001.xlsx, nagashikomi_002.xlsx, ...）
         """
+        os.makedirs(save_dir, exist_ok=True)
 
+        sheet_full = self._build_upload_workbook(fill_values, skip_rows).active
+        rows = list(sheet_full.iter_rows(values_only=True))
+        headers, data_rows = rows[0], rows[1:]
+
+        save_paths = []
+        for start in range(0, max(len(data_rows), 1), max_rows):
+            wb_chunk = Workbook()
+            sheet_chunk = wb_chunk.active
+            sheet_chunk.title = self.sheet_name
+            sheet_chunk.append(headers)
+            for row in data_rows[start:start + max_rows]:
+                sheet_chunk.append(row)
+
+            save_path = os.path.join(save_dir, f"nagashikomi_{len(save_paths) + 1:03d}.xlsx")
+            wb_chunk.save(save_path)
+            save_paths.append(save_path)
+        return save_paths
+
+    def _build_upload_workbook(self, fill_values, skip_rows=None):
+        """
+        按上传格式构建新的工作簿（未保存），数据行数记录到 self.upload_row_count
+        """
+        skip_rows = skip_rows or set()
         headers = [
             "T", "仕入先コード", "センターコード", "指定納期", "担当者コード", "決裁区分", "決裁番号", "発注残管理",
             "商品コード", "発注数量", "明細備考1", "明細備考2", "決裁営業", "お客様", "伝票備考"
         ]
 
-        os.makedirs(save_dir, exist_ok=True)
-
         wb_new = Workbook()
         sheet_new = wb_new.active
         sheet_new.title = self.sheet_name
         sheet_new.append(headers)
 
-        for row in self.sheet.iter_rows(min_row=self.min_row, values_only=True):
+        count = 0
+        for line in self.order_lines():
+            if line.row in skip_rows:
+                continue
+            # 指定納期为 yyyy/mm/dd，编码类字段已是字符串
             new_row = [
-                None, row[2], row[3], row[7], None, None, None, None,
-                row[4], row[6], None, None, None, None, row[10]
+                None, line.supplier, line.warehouse, line.slash_delivery_date(), None, None, None, None,
+                line.product, line.quantity, None, None, None, None, line.remarks
             ]
-            sheet_new.append(new_row)
-
-        for row in sheet_new.iter_rows(min_row=2, min_col=4, max_col=4):  # 指定納期列格式化
-            for cell in row:
-                format_date(cell)
-
-        for col in [2, 3, 9, 10, 15]:  # 一些列转为字符串
-            for row in sheet_new.iter_rows(min_row=2, min_col=col, max_col=col):
-                for cell in row:
-                    if cell.value is not None:
-                        cell.value = str(cell.value)
-
-        for row_idx in range(2, sheet_new.max_row + 1):  # 注意从第2行开始
             for col, val in fill_values.items():
-                sheet_new.cell(row=row_idx, column=col, value=val)
-
-        # 删除“発注数量”为空或为0的行（第10列）
-        rows_to_delete = [
-            row[0].row for row in sheet_new.iter_rows(min_row=2, min_col=10, max_col=10)
-            if row[0].value in [None, 0, "0"]
-        ]
-        for row_idx in reversed(rows_to_delete):
-            sheet_new.delete_rows(row_idx)
+                new_row[col - 1] = val
+            # 跳过“発注数量”为空或为0的行（第10列）
+            if new_row[9] in [None, "0"]:
+                continue
+            sheet_new.append(new_row)
+            count += 1
 
-        save_path = os.path.join(save_dir, "nagashikomi.xlsx")
-        wb_new.save(save_path)
-        return save_path
+        self.upload_row_count = count
+        return wb_new
     
     def get_column_based_dict(self):
         """
@@ -315,30 +346,6 @@ class ExcelProcessor:
         sheet = self.sheet
         return [str(sheet[cell].value).strip() if sheet[cell].value is not None else "" for cell in cell_list]
 
-    def convert_column_to_yyyymmdd(self, column_letter, start_row=2):
-        """
-        将指定列的所有单元格内容转为 'yyyymmdd' 字符串格式
-
-        参数:
-            column_letter (str): 要转换的列，例如 'C'
-            start_row (int): 从哪一行开始处理（默认跳过表头）
-        """
-        col_idx = column_index_from_string(column_letter)
-        for row in range(start_row, self.sheet.max_row + 1):
-            cell = self.sheet.cell(row=row, column=col_idx)
-            value = cell.value
-            if value is None:
-                continue
-            try:
-                # 如果是 datetime 类型，直接格式化
-                if isinstance(value, datetime):
-                    cell.value = value.strftime('%Y%m%d')
-                else:
-                    # 尝试将字符串转换为日期
-                    parsed = datetime.strptime(str(value), '%Y/%m/%d')
-                    cell.value = parsed.strftime('%Y%m%d')
-            except Exception as e:
-                print(f"⚠️ 第 {row} 行转换失败，原值: {value}, 错误: {e}") 
 
 
 
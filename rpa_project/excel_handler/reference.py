@@ -0,0 +1,131 @@
+# reference.py
+import hashlib
+import os
+import threading
+from excel_handler.processor import ExcelProcessor
+from settings import REFERENCE_PATH, REFERENCE_POLL_INTERVAL
+
+
+class ReferenceSnapshot:
+    """
+    配送可能日期表的一个只读快照
+
+    属性:
+        version (str): 文件内容的 sha256 前 12 位
+        index (dict[str, frozenset[str]]): {ID: 有效的 yyyymmdd 日期集合}
+        file_stat (tuple[float, int]): 读取时的 (修改时间, 文件大小)
+    """
+    __slots__ = ("version", "index", "file_stat")
+
+    def __init__(self, version, index, file_stat):
+        self.version = version
+        self.index = index
+        self.file_stat = file_stat
+
+
+class ReferenceDataManager:
+    def __init__(self, path=REFERENCE_PATH, interval=REFERENCE_POLL_INTERVAL):
+        """
+        管理 NPFKB.xlsx 的索引快照：后台轮询文件变化，变化后重建索引并整体替换。
+        已经取得快照的校验继续使用旧快照，不受替换影响。
+
+        参数:
+            path (str): 参考表路径
+            interval (int): 轮询间隔（秒）
+        """
+        self.path = path
+        self.interval = interval
+        self._snapshot = None
+        self._load_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def snapshot(self):
+        """
+        返回当前快照；首次调用时同步加载
+        """
+        snap = self._snapshot
+        if snap is None:
+            with self._load_lock:
+                if self._snapshot is None:
+                    self._snapshot = self._build()
+            snap = self._snapshot
+        return snap
+
+    def start(self):
+        """
+        加载初始快照并启动后台监视线程（已启动时不重复启动）
+        """
+        if self._thread and self._thread.is_alive():
+            return
+        self.snapshot()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._watch, name="reference-watch", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def reload_if_changed(self):
+        """
+        文件的修改时间或大小变化时重建索引
+
+        返回:
+            bool: 内容版本是否发生变化
+        """
+        current = self._snapshot
+        stat = os.stat(self.path)
+        if current and (stat.st_mtime, stat.st_size) == current.file_stat:
+            return False
+
+        with self._load_lock:
+            new = self._build()
+        self._snapshot = new  # 单次赋值即完成替换
+
+        if current is None or new.version != current.version:
+            old_version = current.version if current else "-"
+            print(f"🔄 参考数据已更新: {old_version} → {new.version}")
+            return True
+        return False
+
+    def _watch(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.reload_if_changed()
+            except Exception as e:
+                # 对方团队保存文件的过程中可能读取失败，保留旧快照，下次轮询重试
+                print(f"⚠️ 参考数据重新加载失败，继续使用旧版本: {e}")
+
+    def _build(self):
+        # 只读取一次文件，版本号和索引都来自同一份内容（读取期间文件被替换也不会不一致）
+        with open(self.path, "rb") as f:
+            stat = os.fstat(f.fileno())
+            data = f.read()
+        version = hashlib.sha256(data).hexdigest()[:12]
+
+        b = ExcelProcessor(self.path, content=data)
+        try:
+            columns = b.get_column_based_dict()
+        finally:
+            b.close()
+
+        index = {
+            key: frozenset(d.strip() for d in dates if isinstance(d, str) and d.strip() != '0')
+            for key, dates in columns.items()
+        }
+        return ReferenceSnapshot(version, index, (stat.st_mtime, stat.st_size))
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_reference_manager():
+    """
+    返回进程内共用的 ReferenceDataManager
+    """
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = ReferenceDataManager()
+        return _manager
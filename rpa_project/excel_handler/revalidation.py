@@ -0,0 +1,175 @@
+# revalidation.py
+import hashlib
+import json
+import os
+from datetime import datetime
+from openpyxl.utils import get_column_letter
+from excel_handler.utils import check_dates_in_dict, check_past_dates
+from settings import VALIDATION_CACHE_DIR, MIN_COL, MAX_COL, DATE_COLUMN, ID_COLUMN
+
+
+class RowResult:
+    """
+    一行数据的逐行校验结果（只取决于该行内容、参考数据版本和当天日期）
+
+    属性:
+        empty_columns (list[str]): MIN_COL~MAX_COL 中为空的列字母
+        item_id (str): ID 列的值
+        date (str | None): 日期列的 yyyymmdd，无法识别时为 None（不参与日期检查）
+        not_found (bool | None): (ID, 日期) 不在配送可能日期表中；None 表示尚未检查
+        past (bool | None): 日期早于今天；None 表示尚未检查
+    """
+    __slots__ = ("empty_columns", "item_id", "date", "not_found", "past")
+
+    def __init__(self, empty_columns, item_id, date, not_found=None, past=None):
+        self.empty_columns = empty_columns
+        self.item_id = item_id
+        self.date = date
+        self.not_found = not_found
+        self.past = past
+
+    @property
+    def complete(self):
+        """全部检查都已完成（因错误上限提前停止时部分行未检查，不能缓存）"""
+        return self.date is None or (self.not_found is not None and self.past is not None)
+
+    def to_list(self):
+        return [self.empty_columns, self.item_id, self.date, self.not_found, self.past]
+
+
+def row_fingerprint(values):
+    """
+    返回一行单元格值的内容哈希
+    """
+    return hashlib.sha1(repr(values).encode("utf-8")).hexdigest()[:20]
+
+
+class RowResultCache:
+    def __init__(self, name, reference_version, cache_dir=VALIDATION_CACHE_DIR):
+        """
+        按 L6 名称保存上一次校验的逐行结果 {行内容哈希: RowResult}。
+        参考数据版本、日期或校验列配置不同时不复用（视为空缓存）。
+
+        参数:
+            name (str): L6 名称
+            reference_version (str): 本次校验使用的参考数据版本
+            cache_dir (str): 缓存文件夹
+        """
+        self.name = name
+        digest = hashlib.sha1(name.encode("utf-8")).hexdigest()[:16]
+        self.path = os.path.join(cache_dir, f"{digest}.json")
+        self.signature = "|".join(str(v) for v in (
+            reference_version, datetime.today().strftime("%Y%m%d"), MIN_COL, MAX_COL, ID_COLUMN, DATE_COLUMN))
+        self.rows = self._load() if name else {}
+
+    def save(self, results):
+        """
+        保存本次全部行的结果，供同名文件再次投入时使用
+
+        参数:
+            results (dict[str, RowResult]): {行内容哈希: RowResult}
+        """
+        if not self.name:
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        data = {
+            "name": self.name,
+            "signature": self.signature,
+            "rows": {h: r.to_list() for h, r in results.items()},
+        }
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    def discard(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def _load(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if data.get("name") != self.name or data.get("signature") != self.signature:
+            return {}
+        return {h: RowResult(*v) for h, v in data["rows"].items()}
+
+
+class ReadOnlyRowResultCache(RowResultCache):
+    """
+    只读取、不写入的缓存：投入前校验等不应改变正式流程缓存状态的场合使用
+    """
+
+    def save(self, results):
+        pass
+
+    def discard(self):
+        pass
+
+
+def evaluate_rows(processor, reference_index, cache, collector):
+    """
+    按完整校验的顺序检查数据区各行并记录到 collector：先空单元格，再配送可能日期，最后过去日期。
+    内容与缓存中某行相同的行直接复用结果，只有新增或修改过的行才实际检查；
+    错误总数达到上限（collector.exhausted）后立即停止，剩余的行不再检查。
+
+    参数:
+        processor (ExcelProcessor): 已删除空行的处理器
+        reference_index (dict[str, frozenset[str]]): 参考数据快照的索引
+        cache (RowResultCache): 上一次的结果
+        collector (ErrorAggregator): 错误收集器
+
+    返回:
+        dict[str, RowResult]: 已全部检查完的行 {行内容哈希: RowResult}，用于保存缓存
+    """
+    rows = []
+    results = {}
+    reused = fresh = 0
+    try:
+        for line in processor.order_lines():
+            values = line.values
+            fingerprint = row_fingerprint(values)
+            result = results.get(fingerprint)
+            if result is None and fingerprint in cache.rows:
+                result = cache.rows[fingerprint]
+                reused += 1
+            elif result is None:
+                empty_columns = [
+                    get_column_letter(col) for col in range(MIN_COL, MAX_COL + 1)
+                    if values[col - 1] is None or str(values[col - 1]).strip() == ""
+                ]
+                result = RowResult(empty_columns, str(line.warehouse), line.delivery_date)
+                fresh += 1
+            results[fingerprint] = result
+            rows.append((line.row, result))
+
+            for column in result.empty_columns:
+                collector.add_cell("empty_cells", column, line.row)
+                if collector.exhausted:
+                    return {h: r for h, r in results.items() if r.complete}
+
+        for _, result in rows:
+            if result.date is None:
+                continue
+            if result.not_found is None:
+                result.not_found = bool(check_dates_in_dict([(result.item_id, result.date)], reference_index))
+            if result.not_found:
+                collector.add("找不到日期", (result.item_id, result.date))
+                if collector.exhausted:
+                    return {h: r for h, r in results.items() if r.complete}
+
+        for _, result in rows:
+            if result.date is None:
+                continue
+            if result.past is None:
+                result.past = bool(check_past_dates([(result.item_id, result.date)]))
+            if result.past:
+                collector.add("纳品日为过去日", (result.item_id, result.date))
+                if collector.exhausted:
+                    break
+        return {h: r for h, r in results.items() if r.complete}
+    finally:
+        if cache.rows:
+            print(f"🔁 复用上次校验结果：{reused} 行未变化，重新检查 {fresh} 行")
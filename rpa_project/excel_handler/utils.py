@@ -1,20 +1,51 @@
-from openpyxl.worksheet.worksheet import Worksheet
 from datetime import datetime
 from openpyxl.utils import column_index_from_string
 from datetime import datetime
 import os
+from excel_handler.dates import to_yyyymmdd
+
+
+def build_line_key(row_values, key_columns, date_column=None):
+    """
+    用订单行的指定列拼出匹配 key（对应発注番号 CSV 中的同一行），日期列统一为 yyyymmdd
+
+    参数:
+        row_values (Sequence): 一行的值（A 列下标为 0），如 iter_rows(values_only=True) 的结果
+        key_columns (list[str]): 参与 key 的列，例如 ["C", "D", "E"]
+        date_column (str, optional): 日期列，例如 "H"
+
+    返回:
+        str: 去除空白后的 key
+    """
+    parts = []
+    for col in key_columns:
+        idx = column_index_from_string(col) - 1
+        value = row_values[idx] if idx < len(row_values) else None
+        if col == date_column:
+            value = to_yyyymmdd(value, numeric=True) or value
+        parts.append(str(value).strip())
+    return "".join(parts).replace(" ", "").replace("\u3000", "").replace("\n", "")
 
 def check_dates_in_dict(id_date_tuple, delivery_date_dic):
+    """
+    检查每个 (id, 日期) 是否在配送可能日期表中
+
+    返回:
+        list[tuple[str, str]]: 不匹配的 (id, date_str)
+    """
     unmatched = []
 
     for _id, date_str in id_date_tuple:
         date_str = date_str.strip()  # 去除空格
         delivery_dates = delivery_date_dic.get(_id, [])
 
-        valid_dates = [
-            d.strip() for d in delivery_dates
-            if isinstance(d, str) and d.strip() != '0'
-        ]
+        if isinstance(delivery_dates, frozenset):
+            valid_dates = delivery_dates  # 已建好索引的快照（见 reference.py）
+        else:
+            valid_dates = [
+                d.strip() for d in delivery_dates
+                if isinstance(d, str) and d.strip() != '0'
+            ]
 
         if date_str not in valid_dates:
             unmatched.append((_id, date_str))
@@ -44,55 +75,6 @@ def check_past_dates(id_date_tuple):
 
     return past_dates
 
-def format_date(cell):
-    """格式化日期为 yyyy/mm/dd 格式"""
-    if isinstance(cell.value, datetime):
-        cell.value = cell.value.strftime('%Y/%m/%d')
-    elif isinstance(cell.value, str):
-
-        date_obj = datetime.strptime(cell.value, '%Y-%m-%d')
-        cell.value = date_obj.strftime('%Y/%m/%d')
-
-def format_column_to_yyyymmdd(sheet: Worksheet, column: str, start_row: int = 2):
-    """
-    将指定列的所有日期值统一格式化为 'yyyymmdd' 字符串。
-
-    参数:
-        sheet (Worksheet): 要处理的工作表
-        column (str): 列标，如 'H'
-        start_row (int): 起始行号，默认为 2（跳过标题）
-
-    返回:
-        list[int]: 被格式化的行号列表
-    """
-    formatted_rows = []
-    col_idx = column_index_from_string(column)
-
-    for row in range(start_row, sheet.max_row + 1):
-        cell = sheet.cell(row=row, column=col_idx)
-        if cell.value is None:
-            continue
-        try:
-            # 如果是 datetime 类型
-            if isinstance(cell.value, datetime):
-                cell.value = cell.value.strftime('%Y%m%d')
-                formatted_rows.append(row)
-            # 如果是字符串，尝试转为 datetime 对象
-            elif isinstance(cell.value, str):
-                # 兼容各种常见格式
-                for fmt in ('%Y-%m-%d', '%Y/%m/%d', '%Y.%m.%d'):
-                    try:
-                        date_obj = datetime.strptime(cell.value, fmt)
-                        cell.value = date_obj.strftime('%Y%m%d')
-                        formatted_rows.append(row)
-                        break
-                    except ValueError:
-                        continue
-        except Exception as e:
-            print(f"❌ 第 {row} 行格式化失败: {cell.value} - {e}")
-
-    return formatted_rows
-
 def get_latest_file(download_dir: str) -> str:
     """
     获取指定文件夹中最新（最近修改）的文件路径。
@@ -111,15 +93,3 @@ def get_latest_file(download_dir: str) -> str:
 
     latest_file = max(files, key=os.path.getmtime)
     return latest_file
-
-if __name__ == "__main__":
-    from openpyxl import load_workbook
-    wb = load_workbook("newinput.xlsx")
-    sheet = wb.active
-
-    formatted_rows = format_column_to_yyyymmdd(sheet, "H")
-    print("已格式化行：", formatted_rows)
-
-    wb.close
-
-
@@ -1,18 +1,38 @@
 # workflow.py
 from excel_handler.processor import ExcelProcessor
-from excel_handler.utils import check_dates_in_dict, check_past_dates
-from settings import (TITLE_COLUMNS, EXPECTED_TITLES,MANDATORY_CELLS, MANDATORY_COLUMN,DATE_COLUMN, ID_COLUMN,FILL_VALUES,MIN_COL, MAX_COL)
-from settings import REFERENCE_PATH,KEY_COLUMNS_IN_A, KEY_COLUMNS_IN_B, VALUE_COLUMN_IN_B, TARGET_COLUMN_IN_A,DOWNLOADS_PATH
-import pandas as pd
+from settings import (TITLE_COLUMNS, EXPECTED_TITLES,MANDATORY_CELLS, MANDATORY_COLUMN,FILL_VALUES)
+from settings import KEY_COLUMNS_IN_B, VALUE_COLUMN_IN_B, TARGET_COLUMN_IN_A,DOWNLOADS_PATH
+from settings import UPLOAD_CHUNK_SIZE
 from openpyxl.utils import column_index_from_string
 from excel_handler.utils import get_latest_file
+from excel_handler.reference import get_reference_manager
+from excel_handler.errors import ErrorAggregator
+from excel_handler.revalidation import RowResultCache, evaluate_rows
+from settings import VALIDATION_ERROR_BUDGET, VALIDATION_ERROR_SAMPLES
+from settings import PLACED_INDEX_ENABLED
+from ledger.placed_index import get_placed_index
 
-def validate_excel_data(processor: ExcelProcessor) -> dict:
+# pandas 只在匹配发注番号时才需要，延迟到首次使用时导入以加快启动
+
+def validate_excel_data(processor: ExcelProcessor, cache_class=RowResultCache) -> dict:
     """
     执行一系列校验，如标题、空单元格、历史日期等。
     如果发现错误，返回包含错误信息及详情的字典。
+
+    逐行产生的错误（空单元格、日期）收集到 ErrorAggregator 中，以区间/计数/样例的
+    紧凑形式返回；错误总数达到 VALIDATION_ERROR_BUDGET 后停止后续检查。
+    完整明细可通过 processor.validation_errors.details(类别) 获取。
+
+    逐行结果按 L6 名称缓存：被退回的文件修改后再次投入时，只重新检查内容有变化的行，
+    工作表级检查（表数、标题、L6）每次都执行，错误报告与完整校验相同。
+
+    参数:
+        processor (ExcelProcessor): 订单文件
+        cache_class (type): 逐行结果缓存的类，不应写入缓存时传入 ReadOnlyRowResultCache
     """
     errors = {}
+    collector = ErrorAggregator(VALIDATION_ERROR_BUDGET, VALIDATION_ERROR_SAMPLES)
+    processor.validation_errors = collector
 
     if processor.has_multiple_sheets():
         errors["sheets"] = {"存在多个表"}
@@ -26,70 +46,122 @@ def validate_excel_data(processor: ExcelProcessor) -> dict:
     if processor.is_cell_empty(MANDATORY_CELLS):
         errors["cell_check"] = {"L6 为空白"}
 
-    empty_cells = processor.find_empty_cells(MIN_COL, MAX_COL)
-    if empty_cells:
-        errors["empty_cells"] = empty_cells
+    # 整个校验过程使用同一个快照，后台替换新版本不影响本次校验。
+    # 预加载未运行（或失败）时也要启动监视线程，否则会一直使用第一次加载的版本
+    manager = get_reference_manager()
+    manager.start()
+    reference = manager.snapshot()
+    processor.reference_version = reference.version
+
+    cache = cache_class(processor.get_cell_values_from_workbook(["L6"])[0], reference.version)
+    row_results = evaluate_rows(processor, reference.index, cache, collector)
+
+    errors.update(collector.to_dict())
+    if collector.exhausted:
+        errors["budget"] = {f"错误超过 {VALIDATION_ERROR_BUDGET} 个，已停止检查"}
+
+    # 只有被退回的文件才可能修改后再次投入
+    if errors:
+        cache.save(row_results)
+    else:
+        cache.discard()
+    return errors
 
-    
-    id_date_tuple = processor.get_column_dates_with_colD(DATE_COLUMN, ID_COLUMN)
 
-    b = ExcelProcessor(REFERENCE_PATH)
+def generate_upload_data(processor: ExcelProcessor, save_dir: str) -> str:
+    """
+    调用生成上传数据的函数，返回保存路径。已下单的行不上传（见 fill_placed_lines）。
+    """
+    save_path = processor.create_upload_data(save_dir, FILL_VALUES, skip_rows=fill_placed_lines(processor))
+    return save_path
 
-    delivery_date_dict = b.get_column_based_dict()
 
-    unmatched = check_dates_in_dict(id_date_tuple, delivery_date_dict)
-    if unmatched:
-        errors["找不到日期"] = {unmatched}
+def generate_upload_chunks(processor: ExcelProcessor, save_dir: str, max_rows: int = UPLOAD_CHUNK_SIZE) -> list:
+    """
+    生成按行数切分的上传数据，返回各分批文件路径。
+    """
+    return processor.create_upload_chunks(save_dir, FILL_VALUES, max_rows, skip_rows=fill_placed_lines(processor))
 
-    past_dates = check_past_dates(id_date_tuple)
-    if past_dates:
-        errors["纳品日为过去日"] = {past_dates}
 
-    b.close()
-    
-    return errors
+def fill_placed_lines(processor: ExcelProcessor) -> set:
+    """
+    在已上传订单行索引中查找本订单（同一 L6 名称）的各行，已下单的行直接把発注番号写入目标列。
 
-def generate_upload_data(processor: ExcelProcessor, save_dir: str) -> str:
+    返回:
+        set[int]: 已下单（不需要再上传）的行号
+    """
+    if not PLACED_INDEX_ENABLED:
+        return set()
+
+    keys = {line.row: line.key for line in processor.order_lines()}
+    try:
+        order_name = processor.get_cell_values_from_workbook(["L6"])[0]
+        placed = get_placed_index().lookup(order_name, keys.values())
+    except Exception as e:
+        print(f"⚠️ 已上传订单行索引查询失败，全部行照常上传: {e}")
+        return set()
+
+    target_col_idx = column_index_from_string(TARGET_COLUMN_IN_A)
+    placed_rows = set()
+    for row_idx, key in keys.items():
+        if key in placed:
+            processor.set_cell_value(row_idx, target_col_idx, placed[key])
+            placed_rows.add(row_idx)
+    if placed_rows:
+        print(f"♻️ {len(placed_rows)} 行已在之前的订单中下单，不再上传，已直接填充発注番号")
+    return placed_rows
+
+
+def merge_csv_files(csv_paths, save_path):
     """
-    调用生成上传数据的函数，返回保存路径。
+    将各分批下载的発注番号 CSV 合并为一个文件（cp932，表头只保留一次）。
+
+    返回:
+        str: 合并后的 CSV 路径
     """
-    save_path = processor.create_upload_data(save_dir, FILL_VALUES)
+    import pandas as pd
+
+    frames = [pd.read_csv(p, encoding="cp932", dtype=str) for p in csv_paths]
+    pd.concat(frames, ignore_index=True).to_csv(save_path, index=False, encoding="cp932")
     return save_path
 
 
-def match_and_fill_from_csv(processor: ExcelProcessor):
+def match_and_fill_from_csv(processor: ExcelProcessor, csv_path: str = None):
     """
     在 A 表中，根据指定列组合 key，在 B (CSV) 表中查找匹配项，如果找到则将指定列的值写入 A 表目标列。
     
     参数:
         processor: ExcelProcessor 实例 (处理 A 表)
-        csv_path: CSV 文件路径 (B 表)
+        csv_path: CSV 文件路径 (B 表)，默认取下载文件夹中最新的文件
         key_columns_in_a: List[str]，A 表中参与 key 的列名，如 ['C', 'D', 'E']
         key_columns_in_b: List[str]，CSV 中对应的列名，如 ['col1', 'col2', 'col3']
         value_column_in_b: str，CSV 中要写入 A 表的值所在的列名，如 'F'
         target_column_in_a: str，写入 A 表的目标列名，如 'M'
     """
-    csv_path = get_latest_file(DOWNLOADS_PATH)
+    import pandas as pd
+
+    if csv_path is None:
+        csv_path = get_latest_file(DOWNLOADS_PATH)
 
     df_b = pd.read_csv(csv_path, encoding="cp932", dtype=str).fillna("")  # 读取并填空字符串，避免 NaN 干扰
     df_b["key"] = df_b.apply(lambda row: build_clean_key(row, KEY_COLUMNS_IN_B), axis=1)
     key_value_dict = dict(zip(df_b["key"], df_b[VALUE_COLUMN_IN_B]))  # 假设你要记录的是 F 列的值
-    processor.get_min_max_row()
-    max_row = processor.max_row
-    processor.convert_column_to_yyyymmdd("H")
+    if PLACED_INDEX_ENABLED:
+        try:
+            order_name = processor.get_cell_values_from_workbook(["L6"])[0]
+            get_placed_index().add_many(order_name, key_value_dict.items(), source=csv_path)
+        except Exception as e:
+            print(f"⚠️ 已上传订单行索引写入失败: {e}")
     target_col_idx = column_index_from_string(TARGET_COLUMN_IN_A)
     # print(key_value_dict)
-    # 遍历 A 表的每一行，构造 key 并匹配写入值
-    for row in range(2, max_row + 1):  # 从第2行开始跳过表头
-        key_parts = [str(processor.sheet[f"{col}{row}"].value).strip() for col in KEY_COLUMNS_IN_A]
-        full_key = ''.join(key_parts)
-        full_key = full_key.replace(" ", "").replace("\u3000", "").replace("\n", "")  # ✨ 清理空格
-        # print(f"构造的 key: {full_key}")
-
-        if full_key in key_value_dict:
-            processor.sheet.cell(row=row, column=target_col_idx, value=key_value_dict[full_key])
+    # 遍历 A 表的每一行，用读取时已构造好的 key 匹配写入值
+    for line in processor.order_lines():
+        if line.key in key_value_dict:
+            processor.set_cell_value(line.row, target_col_idx, key_value_dict[line.key])
     return csv_path
 def build_clean_key(row, key_columns):
+    import pandas as pd
+
     def normalize(val):
         if pd.isna(val):
             return ""
@@ -0,0 +1,185 @@
+# xlsx_patch.py
+import os
+import posixpath
+import re
+import shutil
+import zipfile
+from xml.etree import ElementTree as ET
+from xml.sax.saxutils import escape
+from openpyxl.utils import get_column_letter, column_index_from_string
+
+_REL_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+
+_ROW_RE = re.compile(rb'<row\b[^>]*?(?:/>|>.*?</row>)', re.S)
+_CELL_RE = re.compile(rb'<c\b[^>]*?(?:/>|>.*?</c>)', re.S)
+_ATTR_R_RE = re.compile(rb'\br="([A-Z]*)(\d+)"')
+_ATTR_S_RE = re.compile(rb'\bs="(\d+)"')
+_SPANS_RE = re.compile(rb'\s+spans="[^"]*"')
+_PREFIXED_RE = re.compile(rb'<[A-Za-z_][\w.-]*:(?:sheetData|row|c)\b')
+
+
+def patch_xlsx_cells(src_path, dst_path, updates, sheet_index=0):
+    """
+    复制原始 xlsx，只改写指定工作表中发生变化的单元格，其余 zip 条目原样拷贝。
+    先写入临时文件再替换，因此 dst_path 可以与 src_path 相同。
+
+    参数:
+        src_path (str): 原始 xlsx 路径
+        dst_path (str): 输出路径
+        updates (dict[tuple[int, int], object]): {(行号, 列号): 值}
+        sheet_index (int): 要修改的工作表序号（默认第一个）
+
+    返回:
+        str: 输出路径
+    """
+    with zipfile.ZipFile(src_path) as zin:
+        sheet_part = _find_sheet_part(zin, sheet_index)
+        tmp_path = dst_path + ".tmp"
+        try:
+            with zipfile.ZipFile(tmp_path, "w", zipfile.ZIP_DEFLATED) as zout:
+                for info in zin.infolist():
+                    if info.filename == sheet_part and updates:
+                        data = _patch_sheet_xml(zin.read(info), updates)
+                        zout.writestr(info, data)
+                    else:
+                        # 未修改的条目逐块拷贝，不解析内容
+                        with zin.open(info) as src, zout.open(info, "w") as dst:
+                            shutil.copyfileobj(src, dst, 1024 * 1024)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    os.replace(tmp_path, dst_path)
+    return dst_path
+
+
+def _find_sheet_part(zin, sheet_index):
+    """根据 workbook.xml 和关系文件找出第 sheet_index 个工作表对应的 xml 条目"""
+    workbook = ET.fromstring(zin.read("xl/workbook.xml"))
+    sheets = [el for el in workbook.iter() if el.tag.endswith("}sheet")]
+    rel_id = sheets[sheet_index].get(f"{{{_REL_NS}}}id")
+
+    rels = ET.fromstring(zin.read("xl/_rels/workbook.xml.rels"))
+    for rel in rels:
+        if rel.get("Id") == rel_id:
+            target = rel.get("Target")
+            if target.startswith("/"):
+                return target.lstrip("/")
+            return posixpath.normpath(posixpath.join("xl", target))
+    raise KeyError(f"找不到工作表关系 {rel_id}")
+
+
+def _patch_sheet_xml(xml, updates):
+    """按行分组改写单元格；没有改动的行原样保留"""
+    by_row = {}
+    for (row, col), value in updates.items():
+        by_row.setdefault(row, {})[col] = value
+
+    # 以下按无前缀的 <sheetData>/<row>/<c> 查找；使用命名空间前缀（如 <x:row>）的文件
+    # 无法正确匹配，继续处理会插入重复的行而损坏文件，交给调用方改用整体保存
+    if _PREFIXED_RE.search(xml):
+        raise ValueError("工作表 xml 使用了命名空间前缀，无法增量保存")
+    data_start = xml.find(b"<sheetData")
+    if data_start == -1:
+        raise ValueError("工作表 xml 中找不到 sheetData，无法增量保存")
+
+    out = []
+    pos = 0
+    last_row = 0
+    data_end = xml.find(b"</sheetData>")
+
+    if data_end == -1:
+        # <sheetData/>：整个数据区为空，直接展开
+        empty = re.search(rb'<sheetData\s*/>', xml)
+        if not empty:
+            raise ValueError("无法识别 sheetData，无法增量保存")
+        new_rows = b"".join(_build_row(r, by_row[r]) for r in sorted(by_row))
+        return xml[:empty.start()] + b"<sheetData>" + new_rows + b"</sheetData>" + xml[empty.end():]
+
+    for m in _ROW_RE.finditer(xml, data_start, data_end):
+        row_xml = m.group(0)
+        row_num = _row_number(row_xml)
+
+        # 原文件中不存在的行，按顺序插入到当前行之前
+        pending = [r for r in by_row if last_row < r < row_num]
+        out.append(xml[pos:m.start()])
+        for r in sorted(pending):
+            out.append(_build_row(r, by_row.pop(r)))
+
+        if row_num in by_row:
+            out.append(_patch_row(row_xml, row_num, by_row.pop(row_num)))
+        else:
+            out.append(row_xml)
+        pos = m.end()
+        last_row = row_num
+
+    out.append(xml[pos:data_end])
+    for r in sorted(by_row):
+        out.append(_build_row(r, by_row[r]))
+    out.append(xml[data_end:])
+    return b"".join(out)
+
+
+def _row_number(row_xml):
+    m = re.match(rb'<row\b[^>]*?\br="(\d+)"', row_xml)
+    if not m:
+        raise ValueError("行缺少 r 属性，无法增量保存")
+    return int(m.group(1))
+
+
+def _patch_row(row_xml, row_num, cells):
+    """在已有行中替换或按列顺序插入单元格"""
+    head_end = row_xml.find(b">") + 1
+    head = row_xml[:head_end]
+    if head.endswith(b"/>"):
+        head = head[:-2] + b">"
+        body = b""
+    else:
+        body = row_xml[head_end:-len(b"</row>")]
+    # 列数可能超出原 spans 提示，直接去掉让 Excel 自行计算
+    head = _SPANS_RE.sub(b"", head)
+
+    out = []
+    pos = 0
+    for m in _CELL_RE.finditer(body):
+        cell_xml = m.group(0)
+        ref = _ATTR_R_RE.search(cell_xml[:cell_xml.find(b">") + 1])
+        if not ref:
+            raise ValueError(f"第 {row_num} 行单元格缺少 r 属性，无法增量保存")
+        col = column_index_from_string(ref.group(1).decode())
+
+        out.append(body[pos:m.start()])
+        for c in sorted(k for k in cells if k < col):
+            out.append(_build_cell(row_num, c, cells.pop(c)))
+
+        if col in cells:
+            style = _ATTR_S_RE.search(cell_xml[:cell_xml.find(b">") + 1])
+            out.append(_build_cell(row_num, col, cells.pop(col), style.group(1) if style else None))
+        else:
+            out.append(cell_xml)
+        pos = m.end()
+
+    out.append(body[pos:])
+    for c in sorted(cells):
+        out.append(_build_cell(row_num, c, cells[c]))
+    return head + b"".join(out) + b"</row>"
+
+
+def _build_row(row_num, cells):
+    body = b"".join(_build_cell(row_num, c, cells[c]) for c in sorted(cells))
+    return f'<row r="{row_num}">'.encode() + body + b"</row>"
+
+
+def _build_cell(row_num, col, value, style=None):
+    """生成单元格 xml；字符串写成 inlineStr，避免改动 sharedStrings.xml"""
+    ref = f"{get_column_letter(col)}{row_num}"
+    s_attr = f' s="{style.decode()}"' if style else ""
+    if value is None or value == "":
+        return f'<c r="{ref}"{s_attr}/>'.encode()
+    if isinstance(value, bool):
+        return f'<c r="{ref}"{s_attr} t="b"><v>{int(value)}</v></c>'.encode()
+    if isinstance(value, (int, float)):
+        return f'<c r="{ref}"{s_attr}><v>{value}</v></c>'.encode()
+    text = escape(str(value))
+    return f'<c r="{ref}"{s_attr} t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'.encode("utf-8")
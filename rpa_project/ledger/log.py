@@ -2,7 +2,7 @@ from datetime import datetime
 import csv
 import os
 
-def log_process_result(log_path, new_file_path, new_folder_path, save_path=None, name=None, errors=None, result=None, new_csv_path=None):
+def log_process_result(log_path, new_file_path, new_folder_path, save_path=None, name=None, errors=None, result=None, new_csv_path=None, reference_version=None):
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
     # 安全处理各参数
@@ -11,6 +11,7 @@ def log_process_result(log_path, new_file_path, new_folder_path, save_path=None,
     errors = errors or {}
     result = result or {}
     new_csv_path = new_csv_path or ""
+    reference_version = reference_version or ""
 
     # 把 errors 中的内容拉平
     if isinstance(errors, dict):
@@ -38,14 +39,58 @@ def log_process_result(log_path, new_file_path, new_folder_path, save_path=None,
         "UploadSuccess": "" if validation_success == "No" else result.get("success", ""),
         "UploadError": "" if validation_success == "No" else result.get("error", "") if not result.get("success", True) else "",
         "NewCsvPath": "" if validation_success == "No" else new_csv_path,
+        "ReferenceVersion": reference_version,
     }
 
     # 替换所有值中的逗号为一个空格
     log_data_cleaned = {k: (str(v).replace(",", " ") if v is not None else "") for k, v in log_data.items()}
 
     file_exists = os.path.isfile(log_path)
+    if file_exists:
+        _ensure_header(log_path, list(log_data_cleaned.keys()))
     with open(log_path, "a", newline="", encoding="utf-8-sig") as csvfile:
         writer = csv.DictWriter(csvfile, fieldnames=log_data_cleaned.keys())
         if not file_exists:
             writer.writeheader()
         writer.writerow(log_data_cleaned)
+
+
+def log_event(log_path, event, detail=""):
+    """
+    记录运行事件（工作进程回收、崩溃、浏览器清理等）到处理日志同目录的 *_events.csv
+
+    参数:
+        log_path (str): 处理日志路径
+        event (str): 事件名
+        detail (str): 事件详情
+    """
+    event_path = os.path.splitext(log_path)[0] + "_events.csv"
+    row = {
+        "Timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "Event": event,
+        "Detail": str(detail).replace(",", " "),
+    }
+    file_exists = os.path.isfile(event_path)
+    with open(event_path, "a", newline="", encoding="utf-8-sig") as csvfile:
+        writer = csv.DictWriter(csvfile, fieldnames=row.keys())
+        if not file_exists:
+            writer.writeheader()
+        writer.writerow(row)
+
+
+def _ensure_header(log_path, fieldnames):
+    """
+    旧日志缺少新增的列时，只替换表头行（新列都追加在末尾，旧数据行无需改动）
+    """
+    with open(log_path, newline="", encoding="utf-8-sig") as f:
+        header = next(csv.reader(f), [])
+        if header == fieldnames or not header:
+            return
+        rest = f.read()
+
+    if header != fieldnames[:len(header)]:
+        return  # 不是追加列的情况，不改动已有日志
+
+    with open(log_path, "w", newline="", encoding="utf-8-sig") as f:
+        csv.writer(f).writerow(fieldnames)
+        f.write(rest)
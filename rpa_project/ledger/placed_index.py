@@ -0,0 +1,113 @@
+# placed_index.py
+import os
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+from settings import PLACED_INDEX_PATH, PLACED_INDEX_RETENTION_DAYS
+
+
+class PlacedLineIndex:
+    def __init__(self, path=PLACED_INDEX_PATH, retention_days=PLACED_INDEX_RETENTION_DAYS):
+        """
+        已上传订单行的持久索引：{(L6 名称, 行 key): 発注番号}。
+        key 与 match_and_fill_from_csv 的匹配 key 相同，由每次下载的発注番号 CSV 写入；
+        操作员重新投入已部分上传的订单时，已下单的行不再上传，直接从索引填充 M 列。
+        只在同一 L6 名称的订单内查找，并且只使用保留期内的记录，
+        避免其他订单中内容相同的行被误判为已下单。
+
+        参数:
+            path (str): SQLite 数据库路径
+            retention_days (float): 记录的有效天数
+        """
+        self.path = path
+        self.retention_days = retention_days
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def add_many(self, order_name, pairs, source=""):
+        """
+        登记一批已下单的行（L6 名称为空时不登记，発注番号为空的行跳过），同时清除过期记录
+
+        参数:
+            order_name (str): 订单的 L6 名称
+            pairs (Iterable[tuple[str, str]]): (行 key, 発注番号)
+            source (str): 来源 CSV 路径
+
+        返回:
+            int: 登记的行数
+        """
+        if not order_name:
+            return 0
+        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        rows = [(order_name, key, number, source, now) for key, number in pairs if key and number]
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO placed_order_lines (order_name, line_key, order_number, source, placed_at) "
+                    "VALUES (?, ?, ?, ?, ?)", rows)
+                conn.execute("DELETE FROM placed_order_lines WHERE placed_at < ?", (self._cutoff(),))
+        return len(rows)
+
+    def lookup(self, order_name, keys):
+        """
+        在同一 L6 名称、保留期内的记录中批量查询
+
+        参数:
+            order_name (str): 订单的 L6 名称
+            keys (Iterable[str]): 行 key
+
+        返回:
+            dict[str, str]: 已下单的 {行 key: 発注番号}
+        """
+        if not order_name:
+            return {}
+        keys = list(set(keys))
+        found = {}
+        cutoff = self._cutoff()
+        with self._lock:
+            conn = self._connection()
+            for start in range(0, len(keys), 500):  # SQLite 单条语句的参数个数有上限
+                batch = keys[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                found.update(conn.execute(
+                    f"SELECT line_key, order_number FROM placed_order_lines "
+                    f"WHERE order_name = ? AND placed_at >= ? AND line_key IN ({placeholders})",
+                    [order_name, cutoff] + batch).fetchall())
+        return found
+
+    def close(self):
+        with self._lock:
+            if self._conn:
+                self._conn.close()
+                self._conn = None
+
+    def _connection(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            # 旧版不区分订单的 placed_lines 表已不再使用
+            self._conn.execute("DROP TABLE IF EXISTS placed_lines")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS placed_order_lines ("
+                "order_name TEXT NOT NULL, line_key TEXT NOT NULL, order_number TEXT NOT NULL, "
+                "source TEXT, placed_at TEXT, PRIMARY KEY (order_name, line_key))")
+        return self._conn
+
+    def _cutoff(self):
+        return (datetime.now() - timedelta(days=self.retention_days)).strftime("%Y-%m-%d %H:%M:%S")
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_placed_index():
+    """
+    返回进程内共用的 PlacedLineIndex
+    """
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = PlacedLineIndex()
+        return _index
@@ -1,18 +1,30 @@
+import time
+_startup_begin = time.perf_counter()
+
+# 启动时只导入轻量模块；openpyxl/pandas/Selenium 在首次用到时才导入
 from watcher.excel_file_watcher import ExcelFileWatcher
-from excel_handler.processor import ExcelProcessor
-from web_automation.automator import AeonUploader
-from excel_handler.workflow import validate_excel_data, generate_upload_data, match_and_fill_from_csv,move_csv_to_folder,get_latest_file
 from ledger.log import log_process_result
-from settings import DOWNLOADS_PATH
-# 第一步：监视文件夹
-watcher = ExcelFileWatcher()
-print("📂 正在持续监听文件夹...")
+from ledger.log import log_event
+from settings import DOWNLOADS_PATH, UPLOAD_CHUNK_SIZE, STARTUP_IMPORT_BUDGET, LOG_PATH, RETRY_CHECK_INTERVAL
+from retry_queue import RetryQueue, classify_failure
+from profiler import ProfileTrigger
+from archiver import start_archiver
+from warmup import start_warmup
+from supervisor import WorkerSupervisor
+import os
+
 
-while True:
-    new_file_path, new_folder_path = watcher.wait_for_new_file()
-    print("✅ 检测到并移动了文件")
+def process_file(new_file_path, new_folder_path):
+    """
+    处理一个文件：校验 → 生成流しデータ → 上传 → 填充发注番号 → 记录日志。
+    在工作进程中执行（见 supervisor.WorkerSupervisor）。
+    """
+    from excel_handler.processor import ExcelProcessor
+    from excel_handler.workflow import validate_excel_data, generate_upload_data, match_and_fill_from_csv,move_csv_to_folder,get_latest_file
+    from excel_handler.workflow import generate_upload_chunks, merge_csv_files
 
     a = ExcelProcessor(new_file_path)
+    chunk_results = []
 
     try:
         # 第二步：校验excel数据
@@ -22,16 +34,54 @@ while True:
         # print("📄 名称:", name)
         if errors:
             print("❌ 校验失败，原因：", errors)
-            result["success"] = False
+            result = {"success": False}
+        elif UPLOAD_CHUNK_SIZE:
+            # 第三步：大订单按行数分批生成nagashikomi数据
+            chunk_paths = generate_upload_chunks(a, new_folder_path)
+            save_path = "; ".join(chunk_paths)
+            print(f"✅ 流しデータ生成完毕（共 {len(chunk_paths)} 批）")
+            if a.upload_row_count == 0:
+                result = _save_without_upload(a)
+                return
+
+            # 第四步：逐批（或并行）上传，每批的发注番号 CSV 下载到各自目录
+            from web_automation.chunked import upload_chunks, summarize_chunk_results
+            chunk_results = upload_chunks(chunk_paths, new_folder_path)
+            result = summarize_chunk_results(chunk_results)
+            _log_rate_metrics(new_file_path)
+
+            # 第五步：合并成功批次的 CSV 后统一匹配填充
+            csv_paths = [r["csv_path"] for r in chunk_results if r["success"] and r["csv_path"]]
+            if csv_paths:
+                print("✅开始填充发注番号")
+                new_csv_path = merge_csv_files(csv_paths, os.path.join(new_folder_path, "hacchu_merged.csv"))
+                match_and_fill_from_csv(processor=a, csv_path=new_csv_path)
+                a.save()
+                print("💾 文件已保存")
+            if not result["success"]:
+                print("❌ 部分批次上传失败，原因：", result["error"])
+                for chunk_result in chunk_results:
+                    if chunk_result["success"]:
+                        continue
+                    failure = classify_failure(chunk_result)
+                    if failure == "transient":
+                        _enqueue_retry(chunk_result["file_path"], new_file_path, new_folder_path,
+                                       chunk_result["download_dir"], chunk_result["error"])
+                    elif failure == "unconfirmed":
+                        _report_unconfirmed(chunk_result["file_path"], chunk_result["error"])
         else:
             # 第三步：生成nagashikomi数据
 
             save_path = generate_upload_data(a, new_folder_path)
             print("✅ 流しデータ生成完毕")
+            if a.upload_row_count == 0:
+                result = _save_without_upload(a)
+                return
 
             # 第四步：上传数据到 Web
-            uploader = AeonUploader()
-            result = uploader.run(save_path)
+            from web_automation.rate_control import get_rate_controller
+            result = get_rate_controller().run(save_path)
+            _log_rate_metrics(new_file_path)
             if result["success"]:
                 print("✅开始填充发注番号")
                 # 第五步：从 CSV 匹配并填充
@@ -40,13 +90,17 @@ while True:
                 print(f"💾 文件已保存")
                 new_csv_path = move_csv_to_folder(csv_path, new_folder_path)
                 # print(f"{csv_path} 已成功移动到 {new_folder_path}")
-            if result["inputEl"]:
+            elif result.get("inputEl"):
                 print("❌ 投入ERR")
                 csv_path = get_latest_file(DOWNLOADS_PATH)
                 new_csv_path = move_csv_to_folder(csv_path, new_folder_path)
 
             else:
                 print("❌ 上传失败，原因：", result["error"])
+                if classify_failure(result) == "transient":
+                    _enqueue_retry(save_path, new_file_path, new_folder_path, None, result["error"])
+                else:
+                    _report_unconfirmed(save_path, result["error"])
 
     except Exception as e:
         print("⚠️ 处理流程出错:", str(e))
@@ -54,7 +108,7 @@ while True:
     finally:
         a.close()
         log_process_result(
-            log_path=r"C:\Users\rp4-bpo\Box\70.（BPO）本社効率化PT\Wave1　(0605本番稼働)\01　資材チーム\◆07.物流G\log.csv",
+            log_path=LOG_PATH,
             new_file_path=new_file_path,
             new_folder_path=new_folder_path,
             save_path=locals().get("save_path"),
@@ -62,5 +116,172 @@ while True:
             errors=locals().get("errors"),
             result=locals().get("result"),
             new_csv_path = locals().get("new_csv_path"),
+            reference_version=a.reference_version,
         )
-        print("📄 文件处理完毕，继续监听中...\n")
+        # 分批上传时，每批单独记录一行（SavePath 为该批文件）
+        for chunk_result in chunk_results:
+            log_process_result(
+                log_path=LOG_PATH,
+                new_file_path=new_file_path,
+                new_folder_path=new_folder_path,
+                save_path=chunk_result["file_path"],
+                name=locals().get("name"),
+                result=chunk_result,
+                new_csv_path=chunk_result["csv_path"],
+                reference_version=a.reference_version,
+            )
+        start_warmup()  # 为下一个文件重新预热浏览器
+
+
+def _save_without_upload(processor):
+    """全部行都已在之前的订单中下单：不访问门户，保存已从索引填充的発注番号"""
+    print("✅ 全部行已在之前的订单中下单，跳过上传")
+    processor.save()
+    print("💾 文件已保存")
+    return {"success": True, "result": "already_placed"}
+
+
+def _log_rate_metrics(file_path):
+    """上传结束后记录并发控制的状态（并发上限、累计成功/失败、最近一次耗时），用于调整速率参数"""
+    from web_automation.rate_control import get_rate_controller
+    metrics = get_rate_controller().metrics()
+    detail = " ".join(f"{key}={value}" for key, value in metrics.items())
+    log_event(LOG_PATH, "rate_metrics", f"file={file_path} {detail}")
+
+
+def _enqueue_retry(upload_path, order_path, folder_path, download_dir, error):
+    """登记暂时性的上传失败；流しデータ和作业文件夹保留在原处供重试使用"""
+    entry = RetryQueue().add(upload_path, order_path, folder_path, download_dir, error)
+    log_event(LOG_PATH, "retry_enqueued", f"file={upload_path} error={error}")
+    print(f"🔁 已加入重试队列，约 {entry['next_at'] - time.time():.0f}s 后重试")
+
+
+def _report_unconfirmed(upload_path, error):
+    """文件已提交给门户后失败：可能已经下单，不自动重传（避免重复的発注番号），记录下来由人工确认"""
+    print(f"⚠️ 文件已提交但未能确认结果，可能已下单，请在门户确认（不会自动重传）: {os.path.basename(upload_path)}")
+    log_event(LOG_PATH, "upload_unconfirmed", f"file={upload_path} error={error}")
+
+
+def process_retries():
+    """
+    重新上传重试队列中已到时间的文件，成功后填充発注番号并记录日志。
+    任一文件重试成功说明门户已恢复，其余等待中的文件不再等待退避时间，一并处理。
+    在工作进程中执行。
+    """
+    from web_automation.rate_control import get_rate_controller
+
+    queue = RetryQueue()
+    done = set()
+    recovered = False
+    batch = queue.due()
+    while batch:
+        for entry in batch:
+            done.add(entry["id"])
+            print(f"🔁 重试上传（第 {entry['attempts'] + 1} 次）: {os.path.basename(entry['upload_path'])}")
+            result = get_rate_controller().run(entry["upload_path"], download_dir=entry["download_dir"])
+            _log_rate_metrics(entry["upload_path"])
+            failure = None if result["success"] else classify_failure(result)
+            if failure is None or failure == "permanent":
+                queue.remove(entry["id"])
+                recovered = recovered or result["success"]
+                _finish_retry(entry, result)
+            elif failure == "unconfirmed":
+                queue.remove(entry["id"])
+                _report_unconfirmed(entry["upload_path"], result.get("error", ""))
+                _log_retry(entry, result)
+            elif queue.record_failure(entry["id"], result.get("error", "")) is None:
+                print(f"❌ 已达到最大重试次数，放弃: {entry['upload_path']}")
+                log_event(LOG_PATH, "retry_gave_up", f"file={entry['upload_path']} error={result.get('error', '')}")
+                _log_retry(entry, result)
+            else:
+                print("❌ 重试失败，原因：", result.get("error", ""))
+        batch = [e for e in queue.entries() if e["id"] not in done] if recovered else []
+
+
+def _finish_retry(entry, result):
+    """重试成功时填充発注番号并保存到 NEW_ 文件；inputEl 时把错误清单移入作业文件夹"""
+    from excel_handler.processor import ExcelProcessor
+    from excel_handler.workflow import match_and_fill_from_csv, move_csv_to_folder, get_latest_file
+
+    download_dir = entry["download_dir"] or DOWNLOADS_PATH
+    new_csv_path = None
+    try:
+        if result["success"]:
+            print("✅ 重试成功，开始填充发注番号")
+            # 分批上传时其他批次可能已填充到 NEW_ 文件，在其基础上继续填充
+            order_path = entry["order_path"]
+            new_order_path = os.path.join(os.path.dirname(order_path), f"NEW_{os.path.basename(order_path)}")
+            a = ExcelProcessor(new_order_path if os.path.exists(new_order_path) else order_path)
+            try:
+                csv_path = match_and_fill_from_csv(processor=a, csv_path=get_latest_file(download_dir))
+                a.save(new_order_path)
+                print("💾 文件已保存")
+            finally:
+                a.close()
+        else:
+            print("❌ 投入ERR")
+            csv_path = get_latest_file(download_dir)
+        new_csv_path = move_csv_to_folder(csv_path, entry["folder_path"])
+    except Exception as e:
+        print("⚠️ 重试后处理出错:", str(e))
+    finally:
+        log_event(LOG_PATH, "retry_done", f"file={entry['upload_path']} success={result['success']}")
+        _log_retry(entry, result, new_csv_path)
+
+
+def _log_retry(entry, result, new_csv_path=None):
+    log_process_result(
+        log_path=LOG_PATH,
+        new_file_path=entry["order_path"],
+        new_folder_path=entry["folder_path"],
+        save_path=entry["upload_path"],
+        result=result,
+        new_csv_path=new_csv_path,
+    )
+
+
+def run_job(kind, *args):
+    """
+    工作进程的任务入口："file" 处理一个新文件，"profile" 处理并进行性能分析，"retry" 处理重试队列
+    """
+    if kind == "retry":
+        process_retries()
+    elif kind == "profile":
+        from profiler import profile_job
+        with profile_job(args[1]):
+            process_file(*args)
+    else:
+        process_file(*args)
+
+
+def main():
+    # 第一步：监视文件夹
+    watcher = ExcelFileWatcher()
+    supervisor = WorkerSupervisor(run_job, LOG_PATH)
+    retry_queue = RetryQueue()
+    profile_trigger = ProfileTrigger()
+    profile_trigger.install_signal()
+    start_archiver()
+    supervisor.start()
+    startup_seconds = time.perf_counter() - _startup_begin
+    if startup_seconds > STARTUP_IMPORT_BUDGET:
+        print(f"⚠️ 启动耗时 {startup_seconds:.2f}s，超出预算 {STARTUP_IMPORT_BUDGET}s")
+    print(f"📂 正在持续监听文件夹...（启动耗时 {startup_seconds:.2f}s）")
+
+    while True:
+        new_file_path, new_folder_path = watcher.wait_for_new_file(timeout=RETRY_CHECK_INTERVAL)
+        if new_file_path:
+            print("✅ 检测到并移动了文件")
+            kind = "profile" if profile_trigger.take() else "file"
+            if supervisor.submit(kind, new_file_path, new_folder_path) is None:
+                # 工作进程超时被结束或异常退出，process_file 未能记录结果
+                log_process_result(LOG_PATH, new_file_path, new_folder_path,
+                                   result={"success": False, "error": "工作进程超时或异常退出"})
+            print("📄 文件处理完毕，继续监听中...\n")
+        if retry_queue.has_due():
+            supervisor.submit("retry")
+            print("🔁 重试队列处理完毕，继续监听中...\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+# profiler.py
+import cProfile
+import os
+import signal
+import sys
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from settings import WARCH_DIR, PROFILE_NEXT_JOBS, PROFILE_FLAG_FILE, PROFILE_DEFAULT_JOBS, PROFILE_SAMPLE_INTERVAL
+
+
+class ProfileTrigger:
+    def __init__(self, initial=PROFILE_NEXT_JOBS, flag_path=os.path.join(WARCH_DIR, PROFILE_FLAG_FILE),
+                 default_jobs=PROFILE_DEFAULT_JOBS):
+        """
+        在主进程中决定接下来哪些文件需要性能分析。三种开启方式：
+        - settings.PROFILE_NEXT_JOBS：启动后的前 N 个文件
+        - 在 WARCH_DIR 放入 PROFILE_FLAG_FILE（内容为文件数，空文件为 default_jobs），读取后删除
+        - 向主进程发送信号（Windows 为 Ctrl+Break，其他系统为 SIGUSR1）
+
+        参数:
+            initial (int): 启动时就需要分析的文件数
+            flag_path (str): 标记文件路径
+            default_jobs (int): 标记文件/信号未指定数量时分析的文件数
+        """
+        self.remaining = initial
+        self.flag_path = flag_path
+        self.default_jobs = default_jobs
+        self._signalled = 0
+
+    def request(self, jobs=None):
+        """
+        对接下来的 jobs 个文件进行性能分析
+        """
+        self.remaining += jobs or self.default_jobs
+        print(f"🔬 将对接下来的 {self.remaining} 个文件进行性能分析")
+
+    def take(self):
+        """
+        判断下一个文件是否需要分析（需要时消耗一次）
+
+        返回:
+            bool: 是否分析
+        """
+        if self._signalled:
+            signalled, self._signalled = self._signalled, 0
+            self.request(signalled * self.default_jobs)
+        self._check_flag_file()
+        if self.remaining <= 0:
+            return False
+        self.remaining -= 1
+        return True
+
+    def install_signal(self):
+        """
+        注册开启分析的信号（只能在主线程中调用）
+
+        返回:
+            int | None: 注册的信号编号，系统不支持时返回 None
+        """
+        signum = getattr(signal, "SIGBREAK", None) or getattr(signal, "SIGUSR1", None)
+        if signum is None:
+            return None
+        signal.signal(signum, self._on_signal)
+        return signum
+
+    def _on_signal(self, signum, frame):
+        # 信号处理函数中只做计数，在下一次 take() 时生效
+        self._signalled += 1
+
+    def _check_flag_file(self):
+        if not os.path.exists(self.flag_path):
+            return
+        try:
+            with open(self.flag_path, encoding="utf-8") as f:
+                content = f.read().strip()
+            os.remove(self.flag_path)
+        except OSError as e:
+            print(f"⚠️ 读取性能分析标记文件失败: {e}")
+            return
+        self.request(int(content) if content.isdigit() else None)
+
+
+class StackSampler:
+    def __init__(self, interval=PROFILE_SAMPLE_INTERVAL):
+        """
+        定时采样所有线程的调用栈，按 collapsed stack 格式（"线程;函数;函数 次数"）计数，
+        可直接交给 flamegraph.pl 或 speedscope 生成火焰图
+
+        参数:
+            interval (float): 采样间隔（秒）
+        """
+        self.interval = interval
+        self.counts = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="profiler-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def write_folded(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.counts.most_common():
+                f.write(f"{stack} {count}\n")
+        return path
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                labels = []
+                while frame is not None:
+                    code = frame.f_code
+                    labels.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                labels.append(names.get(ident, str(ident)))
+                self.counts[";".join(reversed(labels))] += 1
+
+
+@contextmanager
+def profile_job(output_dir, interval=PROFILE_SAMPLE_INTERVAL):
+    """
+    在 with 块内同时运行 cProfile（当前线程，精确调用次数与耗时）和采样分析（所有线程，
+    包括分批上传的线程），结束后把 profile_<时间>.prof 和 profile_<时间>.folded 写入 output_dir
+
+    参数:
+        output_dir (str): 输出文件夹（通常是作业文件夹，与 nagashikomi.xlsx 放在一起）
+        interval (float): 采样间隔（秒）
+    """
+    profiler = cProfile.Profile()
+    sampler = StackSampler(interval)
+    sampler.start()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        sampler.stop()
+        base = os.path.join(output_dir, f"profile_{datetime.now().strftime('%Y%m%d-%H%M%S')}")
+        try:
+            profiler.dump_stats(base + ".prof")
+            sampler.write_folded(base + ".folded")
+            print(f"🔬 性能分析结果已保存: {base}.prof / .folded")
+        except OSError as e:
+            print(f"⚠️ 性能分析结果保存失败: {e}")
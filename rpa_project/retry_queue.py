@@ -0,0 +1,163 @@
+# retry_queue.py
+import json
+import os
+import random
+import threading
+import time
+import uuid
+from datetime import datetime
+from settings import RETRY_QUEUE_PATH, RETRY_MAX_ATTEMPTS, RETRY_BASE_DELAY, RETRY_MAX_DELAY
+
+_queue_lock = threading.Lock()
+
+
+def classify_failure(result):
+    """
+    判断上传失败是否值得重试
+
+    参数:
+        result (dict): uploader.run 的返回值
+
+    返回:
+        str: "permanent"（inputEl 数据错误，重传结果相同）、
+             "unconfirmed"（文件已提交给门户后出错，可能已经下单，重传会重复下单，需要人工确认）
+             或 "transient"（提交前的门户/网络异常，可以重传）
+    """
+    if result.get("inputEl"):
+        return "permanent"
+    if result.get("submitted"):
+        return "unconfirmed"
+    return "transient"
+
+
+def backoff_delay(attempts, base=RETRY_BASE_DELAY, max_delay=RETRY_MAX_DELAY):
+    """
+    带抖动的指数退避：第 n 次失败后等待 base * 2^(n-1) 秒（不超过 max_delay）的 50%~100%，
+    避免门户故障期间积压的文件在同一时刻一起重试
+
+    参数:
+        attempts (int): 已尝试的次数
+        base (float): 初始等待时间（秒）
+        max_delay (float): 等待时间上限（秒）
+
+    返回:
+        float: 等待秒数
+    """
+    cap = min(max_delay, base * 2 ** max(attempts - 1, 0))
+    return random.uniform(cap / 2, cap)
+
+
+class RetryQueue:
+    def __init__(self, path=RETRY_QUEUE_PATH, max_attempts=RETRY_MAX_ATTEMPTS):
+        """
+        持久化的上传重试队列（JSON 文件），程序重启后仍会继续重试。
+        每个条目记录作业文件夹中保留的流しデータ和订单文件，重试时不再重新校验。
+
+        参数:
+            path (str): 队列文件路径
+            max_attempts (int): 每个文件最多上传的次数（含首次）
+        """
+        self.path = path
+        self.max_attempts = max_attempts
+
+    def entries(self):
+        """
+        返回:
+            list[dict]: 全部等待重试的条目，按下次重试时间排序
+        """
+        with _queue_lock:
+            return sorted(self._load(), key=lambda e: e["next_at"])
+
+    def due(self, now=None):
+        """
+        返回:
+            list[dict]: 已到重试时间的条目
+        """
+        now = time.time() if now is None else now
+        return [e for e in self.entries() if e["next_at"] <= now]
+
+    def has_due(self):
+        return bool(self.due())
+
+    def add(self, upload_path, order_path, folder_path, download_dir=None, error=""):
+        """
+        登记一次暂时性的上传失败（首次上传已计为第 1 次尝试）
+
+        参数:
+            upload_path (str): 要重新上传的流しデータ路径
+            order_path (str): 订单文件路径（填充発注番号用）
+            folder_path (str): 作业文件夹
+            download_dir (str, optional): 分批上传时该批的下载目录，None 表示默认下载文件夹
+            error (str): 失败原因
+
+        返回:
+            dict: 新条目
+        """
+        entry = {
+            "id": uuid.uuid4().hex,
+            "upload_path": upload_path,
+            "order_path": order_path,
+            "folder_path": folder_path,
+            "download_dir": download_dir,
+            "attempts": 1,
+            "last_error": str(error),
+            "created": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "next_at": time.time() + backoff_delay(1),
+        }
+        with _queue_lock:
+            entries = self._load()
+            entries.append(entry)
+            self._save(entries)
+        return entry
+
+    def record_failure(self, entry_id, error=""):
+        """
+        记录一次失败的重试并重新安排时间；达到最大次数时移出队列
+
+        返回:
+            dict | None: 更新后的条目；已放弃重试时返回 None
+        """
+        with _queue_lock:
+            entries = self._load()
+            for entry in entries:
+                if entry["id"] == entry_id:
+                    break
+            else:
+                return None
+            entry["attempts"] += 1
+            entry["last_error"] = str(error)
+            if entry["attempts"] >= self.max_attempts:
+                entries.remove(entry)
+                entry = None
+            else:
+                entry["next_at"] = time.time() + backoff_delay(entry["attempts"])
+            self._save(entries)
+        return entry
+
+    def remove(self, entry_id):
+        with _queue_lock:
+            entries = self._load()
+            remaining = [e for e in entries if e["id"] != entry_id]
+            if len(remaining) != len(entries):
+                self._save(remaining)
+
+    def folders(self):
+        """
+        返回:
+            set[str]: 仍有文件等待重试的作业文件夹
+        """
+        return {e["folder_path"] for e in self.entries()}
+
+    def _load(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return []
+
+    def _save(self, entries):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entries, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, self.path)
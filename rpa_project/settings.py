@@ -7,6 +7,15 @@ WARCH_DIR = r"C:\Users◆"
 #配送可能日期excel路径
 REFERENCE_PATH = r"C:\myenv\NPFKB.xlsx"
 DOWNLOADS_PATH = r"D:\DATA\Downloads"
+LOG_PATH = r"C:\Users\rp4-bpo\Box\70.（BPO）本社効率化PT\Wave1　(0605本番稼働)\01　資材チーム\◆07.物流G\log.csv"
+REFERENCE_POLL_INTERVAL = 30  # 秒，检查配送可能日期表是否被更新
+
+# 作业文件夹归档：超过保留期的文件夹压缩到监视文件夹之外（按日期分目录），并建立索引
+ARCHIVE_ENABLED = True
+ARCHIVE_DIR = r"C:\myenv\archive"
+ARCHIVE_INDEX_PATH = r"C:\myenv\archive\index.sqlite3"
+ARCHIVE_RETENTION_DAYS = 14  # 作业文件夹最后修改后保留的天数
+ARCHIVE_INTERVAL = 3600  # 秒，检查间隔
 
 # 标题校验配置
 TITLE_COLUMNS = ["C", "D", "E", "F", "G", "H", "I", "J", "K"]
@@ -38,20 +47,102 @@ FILL_VALUES = {
 MIN_COL = 3
 MAX_COL = 11
 
+# 日期解析缓存的最大条目数
+DATE_CACHE_SIZE = 4096
+
+# 校验错误收集配置
+VALIDATION_ERROR_BUDGET = 1000  # 错误总数达到上限后停止后续检查
+VALIDATION_ERROR_SAMPLES = 10  # 日志中每类错误最多显示的区间/样例数
+VALIDATION_CACHE_DIR = r"C:\myenv\validation_cache"  # 按 L6 名称保存逐行校验结果，再次投入时只检查变化的行
+VALIDATION_SERVICE_HOST = "127.0.0.1"  # 投入前校验服务只监听本机
+VALIDATION_SERVICE_PORT = 8765
+
 # 创建带时间戳
 TIMESTAMP = datetime.now().strftime("%Y%m%d-%H%M")
 
 
+# 分批上传配置
+UPLOAD_CHUNK_SIZE = 0  # 每批最大行数，0 表示不分批
+UPLOAD_PARALLEL_SESSIONS = 1  # 同时上传的会话数上限（实际并发由 RateController 动态调整）
+
+# 上传速率控制（AIMD：成功且耗时正常时并发 +1，出错或过慢时减半）
+RATE_TARGET_LATENCY = 120  # 秒，单次上传超过该耗时视为门户繁忙
+RATE_MIN_START_INTERVAL = 5  # 秒，两次登录之间的最小间隔
+
+
+# 启动配置
+STARTUP_IMPORT_BUDGET = 0.5  # 秒，开始监听前允许的导入耗时，超出时打印警告
+WARMUP_ENABLED = True  # 开始监听后在后台预加载参考数据和浏览器
+
+
 KEY_COLUMNS_IN_A = ["C", "D", "E", "G", "H", "K"]
 KEY_COLUMNS_IN_B = ["仕入先コード", "センターコード", "商品コード", "発注数量", "指定納期", "伝票備考"]
 VALUE_COLUMN_IN_B = "発注番号"
 TARGET_COLUMN_IN_A = "M"
 
+# 已上传订单行索引：重新投入的订单中已下单的行不再上传，直接填充発注番号
+PLACED_INDEX_ENABLED = True
+PLACED_INDEX_PATH = r"C:\myenv\placed_lines.sqlite3"
+PLACED_INDEX_RETENTION_DAYS = 30  # 只在同一 L6 名称、该天数内上传的行中查找
+
+
+# 上传方式："selenium"（浏览器）或 "http"（直接调用门户接口，登录/上传失败时回退到浏览器）
+# HTTP 接口尚未与真实门户核对，确认前保持 "selenium"
+UPLOAD_BACKEND = "selenium"
+
+# HTTP 上传配置（AEON_PORTAL_URL 可指向本地模拟门户 web_automation/mock_portal.py 进行测试）
+# ⚠️ 以下接口路径和响应格式是占位值，尚未与真实门户核对（需用浏览器开发者工具抓取实际请求后确认）：
+#   登录: 表单 POST OPCD/PSWD，成功时设置 Cookie
+#   上传: multipart POST，字段 "file"；返回 JSON {"success": bool, "rows": [{"id": ...}], "errors": [{"row", "message"}]}
+#   勾选: JSON POST {"ids": [...]}
+#   导出: 表单 POST format=CSV，返回 cp932 的发注番号 CSV（Content-Disposition 带文件名）
+# 核对完成前 HTTP_ENDPOINTS_CONFIRMED 为 False，此时即使 UPLOAD_BACKEND 为 "http" 也使用浏览器
+HTTP_ENDPOINTS_CONFIRMED = False
+AEON_PORTAL_URL = ""
+HTTP_LOGIN_PATH = "/login"  # 占位，待确认
+HTTP_UPLOAD_PATH = "/order/upload"  # 占位，待确认
+HTTP_SELECT_PATH = "/order/select"  # 占位，待确认
+HTTP_EXPORT_PATH = "/order/export"  # 占位，待确认
+HTTP_TIMEOUT = 60  # 秒
 
 # Chrome 相关配置
 CHROME_PATH = r"C:\chrome-win64\chrome.exe"
 CHROMEDRIVER_PATH = r"C:\chromedriver-win64\chromedriver.exe"
 
+# 进程健康配置
+WORKER_MAX_JOBS = 50  # 工作进程处理满该数量的文件后重启
+WORKER_MAX_RSS_MB = 800  # 工作进程常驻内存超过该值（MB）后重启
+WORKER_JOB_TIMEOUT = 3600  # 单个任务的最长处理时间（秒），超时后结束工作进程及其浏览器并重启
+BROWSER_QUIT_TIMEOUT = 30  # 秒，driver.quit() 超时后强制结束浏览器进程树
+CHROME_PID_FILE = r"C:\myenv\chrome_pids.json"  # 登记 chromedriver 进程，用于清理遗留进程
+
+# 上传重试队列：门户/网络异常导致的失败按带抖动的指数退避重试（inputEl 数据错误不重试）
+RETRY_QUEUE_PATH = r"C:\myenv\upload_retry_queue.json"
+RETRY_MAX_ATTEMPTS = 6  # 每个文件最多上传的次数（含首次）
+RETRY_BASE_DELAY = 60  # 秒，第一次重试前的等待时间
+RETRY_MAX_DELAY = 3600  # 秒，重试等待时间上限
+RETRY_CHECK_INTERVAL = 60  # 秒，没有新文件时检查重试队列的间隔
+
+# 按需性能分析：结果（.prof 和火焰图用的 .folded）保存到各文件的作业文件夹
+PROFILE_NEXT_JOBS = 0  # 启动后对前 N 个文件进行分析
+PROFILE_FLAG_FILE = "profile.flag"  # 放入 WARCH_DIR 后对接下来的文件进行分析（内容为文件数，可留空）
+PROFILE_DEFAULT_JOBS = 3  # 标记文件为空或收到信号时分析的文件数
+PROFILE_SAMPLE_INTERVAL = 0.005  # 秒，调用栈采样间隔
+
+# 精简浏览模式：固定小窗口、可复用的精简 profile、拦截不需要的资源
+# （Ext JS 依赖样式表进行布局和可见性判断，因此不拦截 CSS）
+BROWSER_LEAN_MODE = True
+BROWSER_PROFILE_DIR = r"C:\myenv\chrome-profile"
+BROWSER_WINDOW_SIZE = "1280,800"
+BROWSER_BLOCKED_URLS = [
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.svg", "*.ico",
+    "*.woff", "*.woff2", "*.ttf", "*.otf",
+    "*google-analytics.com*", "*googletagmanager.com*",
+]
+
 # 登录信息
 AEON_OPCD =  11
-AEON_PASSWORD =11 
\ No newline at end of file
+AEON_PASSWORD =11
+
+# 多个操作员账号时按会话分配，同一账号同一时间只用于一个会话（避免锁定）
+AEON_CREDENTIALS = [(AEON_OPCD, AEON_PASSWORD)] 
\ No newline at end of file
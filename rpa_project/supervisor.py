@@ -0,0 +1,326 @@
+# supervisor.py
+import json
+import multiprocessing
+import os
+import queue
+import signal
+import subprocess
+import threading
+import time
+from ledger.log import log_event
+from settings import CHROME_PID_FILE, WORKER_MAX_JOBS, WORKER_MAX_RSS_MB, WORKER_JOB_TIMEOUT
+
+_pid_lock = threading.Lock()
+
+
+def track_browser_pid(pid):
+    """
+    登记 chromedriver 进程（连同其启动的 chrome 子进程），记录所属的 Python 进程。
+    同时记录两者的启动时间，PID 被其他进程复用后可以识别出来
+    """
+    owner = os.getpid()
+    with _pid_lock:
+        entries = _load_pids()
+        entries[str(pid)] = {
+            "owner": owner,
+            "owner_started": _process_create_time(owner),
+            "started": _process_create_time(pid),
+        }
+        _save_pids(entries)
+
+
+def untrack_browser_pid(pid):
+    with _pid_lock:
+        entries = _load_pids()
+        if entries.pop(str(pid), None) is not None:
+            _save_pids(entries)
+
+
+def reap_orphan_browsers():
+    """
+    结束所属 Python 进程已经不存在的 chromedriver/chrome 进程树。
+    所属进程的 PID 被其他程序复用时（启动时间不同）同样视为已不存在。
+
+    返回:
+        list[int]: 被结束的 chromedriver PID
+    """
+    killed = []
+    with _pid_lock:
+        entries = _load_pids()
+        for pid, entry in list(entries.items()):
+            if not isinstance(entry, dict):  # 旧格式：只记录了所属进程 PID
+                entry = {"owner": entry, "owner_started": None, "started": None}
+            owner = entry["owner"]
+            if owner != os.getpid() and _is_same_process(owner, entry["owner_started"]):
+                continue  # 所属进程仍在运行，不是孤儿
+            name = _process_name(int(pid))
+            # 防止 PID 被其他程序复用后误杀：进程名和启动时间都要一致
+            if name and "chrome" in name.lower() and _is_same_process(int(pid), entry["started"]):
+                kill_process_tree(int(pid))
+                killed.append(int(pid))
+            del entries[pid]
+        _save_pids(entries)
+    return killed
+
+
+def kill_process_tree(pid):
+    """
+    强制结束进程及其全部子进程
+    """
+    try:
+        import psutil
+    except ImportError:
+        psutil = None
+
+    if psutil:
+        try:
+            parent = psutil.Process(pid)
+            for child in parent.children(recursive=True):
+                child.kill()
+            parent.kill()
+        except psutil.NoSuchProcess:
+            pass
+    elif os.name == "nt":
+        subprocess.run(["taskkill", "/PID", str(pid), "/T", "/F"], capture_output=True)
+    else:
+        try:
+            os.kill(pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+
+
+def current_rss_mb():
+    """
+    返回当前进程的常驻内存（MB）；无法取得时返回 0
+    """
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / 1048576
+    except ImportError:
+        pass
+
+    if os.name == "nt":
+        import ctypes
+        from ctypes import wintypes
+
+        class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+            _fields_ = [
+                ("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD),
+                ("PeakWorkingSetSize", ctypes.c_size_t), ("WorkingSetSize", ctypes.c_size_t),
+                ("QuotaPeakPagedPoolUsage", ctypes.c_size_t), ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t), ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                ("PagefileUsage", ctypes.c_size_t), ("PeakPagefileUsage", ctypes.c_size_t),
+            ]
+
+        counters = PROCESS_MEMORY_COUNTERS()
+        counters.cb = ctypes.sizeof(counters)
+        kernel32, psapi = ctypes.windll.kernel32, ctypes.windll.psapi
+        kernel32.GetCurrentProcess.restype = wintypes.HANDLE
+        psapi.GetProcessMemoryInfo.argtypes = [wintypes.HANDLE, ctypes.POINTER(PROCESS_MEMORY_COUNTERS), wintypes.DWORD]
+        if psapi.GetProcessMemoryInfo(kernel32.GetCurrentProcess(), ctypes.byref(counters), counters.cb):
+            return counters.WorkingSetSize / 1048576
+        return 0.0
+
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1048576
+    except (OSError, ValueError):
+        return 0.0
+
+
+def _process_name(pid):
+    """返回进程名，进程不存在时返回 None"""
+    try:
+        import psutil
+    except ImportError:
+        psutil = None
+
+    if psutil:
+        try:
+            return psutil.Process(pid).name()
+        except psutil.NoSuchProcess:
+            return None
+    if os.name == "nt":
+        out = subprocess.run(["tasklist", "/FI", f"PID eq {pid}", "/FO", "CSV", "/NH"],
+                             capture_output=True, text=True).stdout.strip()
+        return out.split(",")[0].strip('"') if out.startswith('"') else None
+    try:
+        with open(f"/proc/{pid}/comm") as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def _process_create_time(pid):
+    """
+    返回进程的启动时间（psutil 为 epoch 秒，Linux 无 psutil 时为 /proc 的启动 tick 数），
+    无法取得时返回 None
+    """
+    try:
+        import psutil
+    except ImportError:
+        psutil = None
+
+    if psutil:
+        try:
+            return round(psutil.Process(pid).create_time(), 2)
+        except psutil.NoSuchProcess:
+            return None
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            # 进程名可能包含空格，从最后一个 ")" 之后开始按字段切分；starttime 是第 22 个字段
+            return int(f.read().rsplit(")", 1)[1].split()[19])
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+def _is_same_process(pid, started):
+    """
+    进程仍在运行且启动时间与登记时相同（登记时未能取得启动时间则只检查是否存在）
+    """
+    if _process_name(pid) is None:
+        return False
+    return started is None or _process_create_time(pid) == started
+
+
+def _load_pids():
+    try:
+        with open(CHROME_PID_FILE, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_pids(entries):
+    os.makedirs(os.path.dirname(CHROME_PID_FILE) or ".", exist_ok=True)
+    tmp_path = CHROME_PID_FILE + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(entries, f)
+    os.replace(tmp_path, CHROME_PID_FILE)
+
+
+class WorkerSupervisor:
+    def __init__(self, job_func, log_path, max_jobs=WORKER_MAX_JOBS, max_rss_mb=WORKER_MAX_RSS_MB,
+                 job_timeout=WORKER_JOB_TIMEOUT):
+        """
+        在独立的工作进程中逐个处理文件。工作进程处理满 max_jobs 个文件、
+        或常驻内存超过 max_rss_mb 时退出并重新启动；崩溃时同样重启。
+        单个任务超过 job_timeout 秒（浏览器或 openpyxl 卡住）时结束工作进程树并重启。
+        重启前清理该进程遗留的浏览器，相关事件写入日志。
+
+        参数:
+            job_func (callable): 模块级函数，submit 的参数原样传给它
+            log_path (str): 处理日志路径（事件写入同目录的 *_events.csv）
+            max_jobs (int): 每个工作进程最多处理的文件数
+            max_rss_mb (int): 工作进程常驻内存上限（MB）
+            job_timeout (float): 单个任务的最长处理时间（秒），0 表示不限制
+        """
+        self.job_func = job_func
+        self.log_path = log_path
+        self.max_jobs = max_jobs
+        self.max_rss_mb = max_rss_mb
+        self.job_timeout = job_timeout
+        self._ctx = multiprocessing.get_context("spawn")
+        self._process = None
+        self._jobs = None
+        self._results = None
+
+    def start(self):
+        self._reap("startup")
+        self._spawn()
+
+    def submit(self, *args):
+        """
+        把一个任务（例如一个文件）交给工作进程处理并等待完成
+
+        返回:
+            dict | None: 工作进程报告 {"jobs", "rss_mb", "recycle"}；工作进程崩溃或超时时返回 None
+        """
+        if self._process is None or not self._process.is_alive():
+            self._spawn()
+
+        self._jobs.put(args)
+        deadline = time.monotonic() + self.job_timeout if self.job_timeout else None
+        while True:
+            try:
+                report = self._results.get(timeout=5)
+                break
+            except queue.Empty:
+                if deadline and time.monotonic() > deadline:
+                    log_event(self.log_path, "worker_timeout",
+                              f"pid={self._process.pid} timeout={self.job_timeout} args={args}")
+                    print(f"⚠️ 任务超过 {self.job_timeout}s 未完成，结束工作进程并重启")
+                    kill_process_tree(self._process.pid)
+                    self._process.join(timeout=10)
+                    self._reap("worker_timeout")
+                    self._spawn()
+                    return None
+                if not self._process.is_alive():
+                    log_event(self.log_path, "worker_crash",
+                              f"pid={self._process.pid} exitcode={self._process.exitcode} args={args}")
+                    print(f"⚠️ 工作进程异常退出（exitcode={self._process.exitcode}），正在重启")
+                    self._reap("worker_crash")
+                    self._spawn()
+                    return None
+
+        if report["recycle"]:
+            self._process.join(timeout=60)
+            if self._process.is_alive():
+                self._process.kill()
+            log_event(self.log_path, "worker_recycle",
+                      f"pid={self._process.pid} reason={report['recycle']} jobs={report['jobs']} rss_mb={report['rss_mb']:.0f}")
+            print(f"♻️ 工作进程已回收（{report['recycle']}），正在重启")
+            self._reap("worker_recycle")
+            self._spawn()
+        return report
+
+    def stop(self):
+        if self._process and self._process.is_alive():
+            self._jobs.put(None)
+            self._process.join(timeout=60)
+
+    def _spawn(self):
+        self._jobs = self._ctx.Queue()
+        self._results = self._ctx.Queue()
+        self._process = self._ctx.Process(
+            target=_worker_main,
+            args=(self.job_func, self._jobs, self._results, self.max_jobs, self.max_rss_mb),
+            name="rpa-worker",
+        )
+        self._process.start()
+
+    def _reap(self, reason):
+        killed = reap_orphan_browsers()
+        if killed:
+            log_event(self.log_path, "browser_reaped", f"reason={reason} pids={killed}")
+            print(f"🧹 已清理遗留的浏览器进程: {killed}")
+
+
+def _worker_main(job_func, jobs, results, max_jobs, max_rss_mb):
+    # Windows 上 Ctrl+Break 会发给同一控制台的所有进程；它只用于通知主进程开启性能分析
+    if hasattr(signal, "SIGBREAK"):
+        signal.signal(signal.SIGBREAK, signal.SIG_IGN)
+
+    from warmup import start_warmup
+    start_warmup()
+
+    done = 0
+    while True:
+        args = jobs.get()
+        if args is None:
+            break
+        try:
+            job_func(*args)
+        except Exception as e:
+            print("⚠️ 处理流程出错:", str(e))
+        done += 1
+
+        rss_mb = current_rss_mb()
+        recycle = None
+        if done >= max_jobs:
+            recycle = "max_jobs"
+        elif max_rss_mb and rss_mb > max_rss_mb:
+            recycle = "max_rss"
+        results.put({"jobs": done, "rss_mb": rss_mb, "recycle": recycle})
+        if recycle:
+            break
@@ -0,0 +1,61 @@
+from datetime import date, datetime
+
+import pytest
+
+from excel_handler.dates import to_yyyymmdd
+from excel_handler.utils import build_line_key
+
+
+@pytest.mark.parametrize("value, expected", [
+    (datetime(2026, 10, 20, 13, 45), "20261020"),
+    (date(2026, 1, 5), "20260105"),
+    ("20261020", "20261020"),
+    ("2026-10-20", "20261020"),
+    ("2026/10/20", "20261020"),
+    ("2026.10.20", "20261020"),
+    (" 2026/10/20 ", "20261020"),
+    ("2026/1/5", "20260105"),
+    ("20260230", None),
+    ("2026/13/01", None),
+    ("明日", None),
+    ("", None),
+    (None, None),
+    (True, None),
+])
+def test_non_numeric_values(value, expected):
+    assert to_yyyymmdd(value) == expected
+    assert to_yyyymmdd(value, numeric=True) == expected
+
+
+def test_numbers_are_not_dates_by_default():
+    assert to_yyyymmdd(20261020) is None
+    assert to_yyyymmdd(45000) is None
+    assert to_yyyymmdd(3.5) is None
+
+
+@pytest.mark.parametrize("value, expected", [
+    (20261020, "20261020"),      # 8 位整数按 yyyymmdd
+    (20261020.0, "20261020"),
+    (20260230, None),            # 8 位但不是有效日期
+    (45000, "20230315"),         # Excel 日期序列值
+    (45000.75, "20230315"),      # 带时间的序列值只取日期
+    (1, "18991231"),
+    (0, None),
+    (-5, None),
+    (99991232, None),
+])
+def test_numbers_in_date_columns(value, expected):
+    assert to_yyyymmdd(value, numeric=True) == expected
+
+
+def test_cache_distinguishes_numeric_flag():
+    # 同一个值先按日期列解析，再按普通值解析，不能复用前一次的缓存结果
+    assert to_yyyymmdd(44927, numeric=True) == "20230101"
+    assert to_yyyymmdd(44927) is None
+
+
+def test_line_key_normalizes_only_the_date_column():
+    row = (None, None, "S1", "W1", "P1", None, 20261020, "2026/10/20", None, None, "備考 ")
+    key = build_line_key(row, ["C", "D", "E", "G", "H", "K"], date_column="H")
+    # G 列的数值不是日期列，原样保留；H 列统一为 yyyymmdd
+    assert key == "S1W1P12026102020261020備考"
@@ -0,0 +1,56 @@
+from excel_handler.errors import ErrorAggregator, ErrorGroup
+
+
+def test_cells_merge_into_ranges_per_column():
+    group = ErrorGroup("empty_cells", sample_size=10)
+    for row in (5, 6, 7, 9):
+        group.add_cell("C", row)
+    group.add_cell("AA", 3)
+    group.add_cell("D", 7)
+
+    # 按列号排序（D 在 AA 之前），连续的行合并为一个区间
+    assert group.ranges() == ["C5:C7", "C9", "D7", "AA3"]
+    assert group.details() == ["C5", "C6", "C7", "C9", "D7", "AA3"]
+    assert len(group) == 6
+    assert str(group) == "C5:C7 C9 D7 AA3（共 6 个）"
+
+
+def test_items_keep_only_samples_for_display_but_all_details():
+    group = ErrorGroup("找不到日期", sample_size=2)
+    for i in range(5):
+        group.add(("W1", f"2026010{i}"))
+
+    assert group.samples == [("W1", "20260100"), ("W1", "20260101")]
+    assert len(group.details()) == 5
+    assert str(group).endswith(" 等（共 5 个）")
+
+
+def test_ranges_beyond_sample_size_are_summarized():
+    group = ErrorGroup("empty_cells", sample_size=2)
+    for row in (1, 3, 5):
+        group.add_cell("C", row)
+
+    assert str(group) == "C1 C3 等3处（共 3 个）"
+
+
+def test_budget_counts_all_categories():
+    collector = ErrorAggregator(budget=3)
+    collector.add_cell("empty_cells", "C", 2)
+    collector.add("找不到日期", ("W1", "20260101"))
+    assert not collector.exhausted
+
+    collector.add("纳品日为过去日", ("W1", "20200101"))
+    assert collector.exhausted
+    assert collector.total == 3
+
+
+def test_to_dict_only_contains_categories_with_errors():
+    collector = ErrorAggregator(budget=10)
+    collector.group("empty_cells")
+    collector.add("找不到日期", ("W1", "20260101"))
+
+    errors = collector.to_dict()
+    assert list(errors) == ["找不到日期"]
+    assert collector.details("找不到日期") == [("W1", "20260101")]
+    assert collector.details("empty_cells") == []
+    assert collector.details("unknown") == []
@@ -0,0 +1,126 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from excel_handler import revalidation
+from excel_handler.errors import ErrorAggregator
+from excel_handler.order_lines import OrderLine
+from excel_handler.revalidation import (ReadOnlyRowResultCache, RowResult, RowResultCache, evaluate_rows,
+                                        row_fingerprint)
+
+FUTURE = (datetime.today() + timedelta(days=30)).strftime("%Y%m%d")
+PAST = (datetime.today() - timedelta(days=30)).strftime("%Y%m%d")
+
+
+def make_line(row, warehouse, delivery_date, empty_k=False):
+    # A~K 列；C~K 为必填列（MIN_COL~MAX_COL），D 为 ID，H 为日期
+    values = (None, None, "S1", warehouse, "P1", "x", 1, delivery_date, "x", "x", None if empty_k else "備考")
+    return OrderLine(row, values, "S1", warehouse, "P1", "1", delivery_date, "備考", f"key{row}")
+
+
+class FakeProcessor:
+    def __init__(self, lines):
+        self.lines = lines
+
+    def order_lines(self):
+        return self.lines
+
+
+class CountingIndex(dict):
+    """记录配送可能日期表被查询的次数"""
+
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.lookups = 0
+
+    def get(self, key, default=None):
+        self.lookups += 1
+        return super().get(key, default)
+
+
+@pytest.fixture
+def cache_dir(tmp_path):
+    return str(tmp_path / "cache")
+
+
+def run(lines, index, cache, budget=1000):
+    collector = ErrorAggregator(budget)
+    results = evaluate_rows(FakeProcessor(lines), index, cache, collector)
+    return collector, results
+
+
+def test_fingerprint_depends_only_on_values():
+    a = make_line(2, "W1", FUTURE)
+    b = make_line(7, "W1", FUTURE)
+    assert row_fingerprint(a.values) == row_fingerprint(b.values)
+    assert row_fingerprint(a.values) != row_fingerprint(make_line(2, "W2", FUTURE).values)
+
+
+def test_errors_match_a_full_check(cache_dir):
+    index = {"W1": frozenset({FUTURE, PAST})}
+    lines = [make_line(2, "W1", FUTURE), make_line(3, "W9", FUTURE), make_line(4, "W1", PAST, empty_k=True)]
+    collector, results = run(lines, index, RowResultCache("店A", "v1", cache_dir))
+
+    assert collector.details("empty_cells") == ["K4"]
+    assert collector.details("找不到日期") == [("W9", FUTURE)]
+    assert collector.details("纳品日为过去日") == [("W1", PAST)]
+    assert len(results) == 3 and all(r.complete for r in results.values())
+
+
+def test_unchanged_rows_are_reused_from_cache(cache_dir):
+    index = CountingIndex({"W1": frozenset({FUTURE}), "W2": frozenset({FUTURE})})
+    lines = [make_line(2, "W1", FUTURE), make_line(3, "W9", FUTURE)]
+    first, results = run(lines, index, RowResultCache("店A", "v1", cache_dir))
+    RowResultCache("店A", "v1", cache_dir).save(results)
+    assert index.lookups == 2
+
+    # 再次投入：一行未变、一行修改，只查询修改过的行，错误报告与完整检查相同
+    index.lookups = 0
+    lines = [make_line(2, "W1", FUTURE), make_line(3, "W2", FUTURE)]
+    second, _ = run(lines, index, RowResultCache("店A", "v1", cache_dir))
+    assert index.lookups == 1
+    assert second.to_dict() == {}
+    assert first.details("找不到日期") == [("W9", FUTURE)]
+
+
+def test_cache_is_invalidated_by_reference_version(cache_dir):
+    results = {"h": RowResult([], "W1", FUTURE, False, False)}
+    RowResultCache("店A", "v1", cache_dir).save(results)
+
+    assert set(RowResultCache("店A", "v1", cache_dir).rows) == {"h"}
+    assert RowResultCache("店A", "v2", cache_dir).rows == {}
+    assert RowResultCache("店B", "v1", cache_dir).rows == {}
+
+
+def test_cache_is_invalidated_on_the_next_day(cache_dir, monkeypatch):
+    RowResultCache("店A", "v1", cache_dir).save({"h": RowResult([], "W1", FUTURE, False, False)})
+
+    class Tomorrow(datetime):
+        @classmethod
+        def today(cls):
+            return datetime.today() + timedelta(days=1)
+
+    monkeypatch.setattr(revalidation, "datetime", Tomorrow)
+    assert RowResultCache("店A", "v1", cache_dir).rows == {}
+
+
+def test_read_only_cache_never_writes(cache_dir):
+    cache = RowResultCache("店A", "v1", cache_dir)
+    cache.save({"h": RowResult([], "W1", FUTURE, False, False)})
+
+    read_only = ReadOnlyRowResultCache("店A", "v1", cache_dir)
+    assert set(read_only.rows) == {"h"}
+    read_only.save({})
+    read_only.discard()
+    assert set(RowResultCache("店A", "v1", cache_dir).rows) == {"h"}
+
+
+def test_budget_stops_lookups_and_skips_incomplete_rows(cache_dir):
+    index = CountingIndex({})
+    lines = [make_line(row, f"W{row}", FUTURE) for row in range(2, 102)]
+    collector, results = run(lines, index, RowResultCache("店A", "v1", cache_dir), budget=5)
+
+    assert collector.exhausted
+    assert index.lookups == 5
+    # 过去日期检查未执行，这些行的结果不完整，不能缓存
+    assert results == {}
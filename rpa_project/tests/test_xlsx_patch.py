@@ -0,0 +1,62 @@
+import zipfile
+
+import pytest
+
+openpyxl = pytest.importorskip("openpyxl")
+from openpyxl.styles import Font, PatternFill
+
+from excel_handler.xlsx_patch import patch_xlsx_cells, _patch_sheet_xml
+
+
+@pytest.fixture
+def order_xlsx(tmp_path):
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = "発注"
+    ws.append(["仕入先", "商品", "数量"] + [None] * 9 + ["発注番号"])
+    ws.append(["S1", "P1", 3])
+    ws.append(["S2", "P2", 5])
+    ws["A1"].font = Font(bold=True)
+    ws["B2"].fill = PatternFill("solid", fgColor="FFFF00")
+    ws["M2"].number_format = "@"
+    ws["M2"].font = Font(color="FF0000")
+    ws["D3"] = "=C3*2"
+    path = tmp_path / "order.xlsx"
+    wb.save(path)
+    return path
+
+
+def test_patch_column_m_keeps_other_cells_and_styles(order_xlsx, tmp_path):
+    dst = tmp_path / "NEW_order.xlsx"
+    patch_xlsx_cells(str(order_xlsx), str(dst), {(2, 13): "0000000001", (3, 13): "0000000002"})
+
+    before = openpyxl.load_workbook(order_xlsx).active
+    after = openpyxl.load_workbook(dst).active
+    assert after["M2"].value == "0000000001"
+    assert after["M3"].value == "0000000002"
+    # 改写的单元格沿用原来的样式，其他单元格的值和样式不变（styles.xml 原样拷贝，样式编号可直接比较）
+    assert after["M2"].style_id == before["M2"].style_id
+    assert after["M2"].font.color.rgb == "00FF0000"
+    assert after["M2"].number_format == "@"
+    for ref in ("A1", "B2", "C2", "C3", "D3", "M1"):
+        assert after[ref].value == before[ref].value
+        assert after[ref].style_id == before[ref].style_id
+    assert after["A1"].font.b
+    assert after["B2"].fill.fgColor.rgb == "00FFFF00"
+    assert after.title == "発注"
+
+
+def test_empty_updates_copy_the_workbook(order_xlsx, tmp_path):
+    dst = tmp_path / "copy.xlsx"
+    patch_xlsx_cells(str(order_xlsx), str(dst), {})
+    with zipfile.ZipFile(order_xlsx) as src, zipfile.ZipFile(dst) as out:
+        assert src.namelist() == out.namelist()
+        for name in src.namelist():
+            assert src.read(name) == out.read(name)
+
+
+def test_prefixed_sheet_xml_is_rejected():
+    xml = (b'<x:worksheet xmlns:x="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+           b'<x:sheetData><x:row r="2"><x:c r="A2"><x:v>1</x:v></x:c></x:row></x:sheetData></x:worksheet>')
+    with pytest.raises(ValueError):
+        _patch_sheet_xml(xml, {(2, 13): "1"})
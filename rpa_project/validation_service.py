@@ -0,0 +1,166 @@
+# validation_service.py
+"""
+投入前校验服务：常驻进程保持参考数据和 openpyxl 已加载，对提交的 Excel 执行与正式流程相同的
+validate_excel_data 校验并立即返回结果。不移动文件、不访问门户，有问题的文件不会进入监视文件夹。
+
+用法:
+    python validation_service.py serve            启动服务（仅监听本机）
+    python validation_service.py check <文件.xlsx>  提交文件校验；服务未启动时在本进程内校验
+"""
+import json
+import os
+import sys
+import tempfile
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from time import perf_counter
+from urllib.parse import quote, unquote
+from settings import VALIDATION_SERVICE_HOST, VALIDATION_SERVICE_PORT
+
+
+def validate_workbook(path):
+    """
+    对一个 Excel 文件执行 validate_excel_data（只读：不修改、不移动原文件，也不改写逐行校验缓存）
+
+    参数:
+        path (str): Excel 文件路径
+
+    返回:
+        dict: valid、name（L6）、reference_version、errors（每类的摘要）、details（每类的完整列表）、elapsed（秒）
+    """
+    from excel_handler.processor import ExcelProcessor
+    from excel_handler.workflow import validate_excel_data
+    from excel_handler.errors import ErrorGroup
+    from excel_handler.revalidation import ReadOnlyRowResultCache
+
+    start = perf_counter()
+    processor = ExcelProcessor(path)
+    try:
+        errors = validate_excel_data(processor, cache_class=ReadOnlyRowResultCache)
+        name = processor.get_cell_values_from_workbook(["L6"])[0]
+    finally:
+        processor.close()
+
+    summaries, details = {}, {}
+    for category, value in errors.items():
+        if isinstance(value, ErrorGroup):
+            summaries[category] = str(value)
+            details[category] = [list(item) if isinstance(item, tuple) else item for item in value.details()]
+        else:
+            summaries[category] = "; ".join(str(v) for v in value)
+            details[category] = [str(v) for v in value]
+
+    return {
+        "valid": not errors,
+        "name": name,
+        "reference_version": processor.reference_version,
+        "errors": summaries,
+        "details": details,
+        "elapsed": round(perf_counter() - start, 3),
+    }
+
+
+class _ValidationHandler(BaseHTTPRequestHandler):
+    """
+    GET  /health   → {"status": "ok", "reference_version": ...}
+    POST /validate → 请求体为 xlsx 内容（文件名放在 X-Filename 头），
+                     或 JSON {"path": "本机文件路径"}
+    """
+
+    def do_GET(self):
+        if self.path != "/health":
+            return self._send_json(404, {"error": "not found"})
+        from excel_handler.reference import get_reference_manager
+        self._send_json(200, {"status": "ok", "reference_version": get_reference_manager().snapshot().version})
+
+    def do_POST(self):
+        if self.path != "/validate":
+            return self._send_json(404, {"error": "not found"})
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        try:
+            if self.headers.get("Content-Type", "").startswith("application/json"):
+                result = validate_workbook(json.loads(body.decode("utf-8"))["path"])
+            else:
+                filename = os.path.basename(unquote(self.headers.get("X-Filename", "upload.xlsx")))
+                with tempfile.TemporaryDirectory() as tmp_dir:
+                    tmp_path = os.path.join(tmp_dir, filename or "upload.xlsx")
+                    with open(tmp_path, "wb") as f:
+                        f.write(body)
+                    result = validate_workbook(tmp_path)
+        except Exception as e:
+            return self._send_json(400, {"error": str(e)})
+
+        status = "✅ 通过" if result["valid"] else "❌ 不通过"
+        print(f"🔎 投入前校验 {result['name']}: {status}（{result['elapsed']}s）")
+        self._send_json(200, result)
+
+    def log_message(self, format, *args):
+        pass  # 不输出每个请求的访问日志
+
+    def _send_json(self, status, payload):
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def serve(host=VALIDATION_SERVICE_HOST, port=VALIDATION_SERVICE_PORT):
+    """
+    预加载参考数据后启动校验服务（逐个处理请求）
+    """
+    from excel_handler.reference import get_reference_manager
+    import excel_handler.workflow  # noqa: F401  预先导入 openpyxl 和校验模块
+
+    get_reference_manager().start()  # 加载参考数据并在 NPFKB.xlsx 更新时自动重新加载
+    server = HTTPServer((host, port), _ValidationHandler)
+    print(f"🔎 投入前校验服务已启动: http://{host}:{port}/validate")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+
+
+def check(path, host=VALIDATION_SERVICE_HOST, port=VALIDATION_SERVICE_PORT):
+    """
+    把文件提交给校验服务；服务未启动时在本进程内校验（需要加载参考数据，较慢）
+
+    返回:
+        dict: 与 validate_workbook 相同
+    """
+    with open(path, "rb") as f:
+        body = f.read()
+    request = urllib.request.Request(
+        f"http://{host}:{port}/validate", data=body, method="POST",
+        headers={"Content-Type": "application/octet-stream", "X-Filename": quote(os.path.basename(path))})
+    try:
+        with urllib.request.urlopen(request, timeout=60) as resp:
+            return json.loads(resp.read().decode("utf-8"))
+    except urllib.error.HTTPError as e:
+        return {"valid": False, "errors": {"service": json.loads(e.read().decode("utf-8")).get("error", str(e))}}
+    except urllib.error.URLError:
+        print("⚠️ 校验服务未启动，在本进程内校验")
+        return validate_workbook(path)
+
+
+def main(argv):
+    if len(argv) >= 1 and argv[0] == "serve":
+        serve()
+        return 0
+    if len(argv) == 2 and argv[0] == "check":
+        result = check(argv[1])
+        if result["valid"]:
+            print(f"✅ 校验通过（{result.get('elapsed', '-')}s）")
+            return 0
+        print("❌ 校验失败，原因：")
+        for category, summary in result["errors"].items():
+            print(f"  {category}: {summary}")
+        return 1
+    print(__doc__)
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,34 @@
+# warmup.py
+import threading
+from settings import WARMUP_ENABLED, UPLOAD_BACKEND
+
+
+def start_warmup(browser=UPLOAD_BACKEND == "selenium"):
+    """
+    在后台线程中预加载 pandas/openpyxl、参考数据和浏览器，不阻塞文件监听
+
+    参数:
+        browser (bool): 是否同时预先启动一个浏览器（默认仅在使用浏览器上传时启动）
+
+    返回:
+        threading.Thread | None: 预加载线程（未启用时返回 None）
+    """
+    if not WARMUP_ENABLED:
+        return None
+    thread = threading.Thread(target=_warm_up, args=(browser,), name="warmup", daemon=True)
+    thread.start()
+    return thread
+
+
+def _warm_up(browser):
+    try:
+        from excel_handler.reference import get_reference_manager
+        get_reference_manager().start()  # 加载参考数据并开始监视 NPFKB.xlsx
+        import pandas  # noqa: F401  首次匹配发注番号时不再等待导入
+
+        if browser:
+            from web_automation.automator import AeonUploader
+            AeonUploader.prewarm()
+        print("🔥 预加载完成")
+    except Exception as e:
+        print(f"⚠️ 预加载失败: {e}")
@@ -9,11 +9,12 @@ class ExcelFileWatcher:
         self.interval = interval
         self.processed_files = set()
 
-    def wait_for_new_file(self):
+    def wait_for_new_file(self, timeout=None):
         """
         等待新 Excel 文件并将其移动到带时间戳的新文件夹中。
-        返回处理后的文件完整路径和新文件夹路径。
+        返回处理后的文件完整路径和新文件夹路径；超过 timeout 秒仍没有新文件时返回 (None, None)。
         """
+        deadline = None if timeout is None else time.monotonic() + timeout
         while True:
             current_files = {
                 os.path.join(self.watch_dir, f)
@@ -42,5 +43,7 @@ class ExcelFileWatcher:
 
                 return new_file_path, new_folder_path  # 返回文件路径和目录路径
 
+            if deadline is not None and time.monotonic() >= deadline:
+                return None, None
             time.sleep(self.interval)
 
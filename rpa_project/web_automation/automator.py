@@ -6,30 +6,196 @@ from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.action_chains import ActionChains
-from time import sleep
+from time import sleep, perf_counter
+from contextlib import contextmanager
+import atexit
+import os
+import threading
 from settings import CHROME_PATH, CHROMEDRIVER_PATH, AEON_OPCD, AEON_PASSWORD
+from settings import BROWSER_LEAN_MODE, BROWSER_PROFILE_DIR, BROWSER_WINDOW_SIZE, BROWSER_BLOCKED_URLS
+from settings import BROWSER_QUIT_TIMEOUT
+from supervisor import track_browser_pid, untrack_browser_pid, kill_process_tree
 from selenium.common.exceptions import TimeoutException
 
+# 预热好的浏览器及其占用的 profile 槽位（仅默认下载目录的会话可复用）
+_warm_driver = None
+_warm_lock = threading.Lock()
+
+# 精简模式下每个同时运行的浏览器占用一个 profile 目录（Chrome 不允许共用）
+_profile_slots = set()
+
+
+def _acquire_profile_slot():
+    with _warm_lock:
+        slot = 0
+        while slot in _profile_slots:
+            slot += 1
+        _profile_slots.add(slot)
+    return slot
+
+
+def _release_profile_slot(slot):
+    with _warm_lock:
+        _profile_slots.discard(slot)
+
+
+def _quit_driver(driver):
+    """
+    关闭浏览器；quit() 超时或失败时强制结束 chromedriver 进程树，并取消登记
+    """
+    process = getattr(driver.service, "process", None)
+    pid = process.pid if process else None
+    failed = []
+
+    def _quit():
+        try:
+            driver.quit()
+        except Exception as e:
+            failed.append(e)
+
+    quitter = threading.Thread(target=_quit, daemon=True)
+    quitter.start()
+    quitter.join(BROWSER_QUIT_TIMEOUT)
+    if pid and (quitter.is_alive() or failed):
+        print(f"⚠️ 浏览器未能正常关闭，强制结束进程 {pid}")
+        kill_process_tree(pid)
+    if pid:
+        untrack_browser_pid(pid)
+
+
+def _block_resources(driver):
+    """
+    通过 DevTools 协议拦截不需要的资源（图片、字体、统计脚本）。
+    设置只对当前标签页有效，切换到新标签页后需要再次调用
+    """
+    driver.execute_cdp_cmd("Network.enable", {})
+    driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BROWSER_BLOCKED_URLS})
+
+
+def _take_warm_driver():
+    """取出预热的浏览器 (driver, profile 槽位)；如果它已经失效则关闭并返回 None"""
+    global _warm_driver
+    with _warm_lock:
+        warm, _warm_driver = _warm_driver, None
+    if warm is None:
+        return None
+    driver, slot = warm
+    try:
+        driver.window_handles  # 检查会话是否仍然可用
+        return driver, slot
+    except Exception:
+        _quit_driver(driver)
+        if slot is not None:
+            _release_profile_slot(slot)
+        return None
+
+
+@atexit.register
+def _discard_warm_driver():
+    warm = _take_warm_driver()
+    if warm:
+        driver, slot = warm
+        _quit_driver(driver)
+        if slot is not None:
+            _release_profile_slot(slot)
+
+
 class AeonUploader:
-    def __init__(self):
+    def __init__(self, download_dir=None, credential=None):
         self.chrome_path = CHROME_PATH
         self.driver_path = CHROMEDRIVER_PATH
-        self.opcd = AEON_OPCD
-        self.password = AEON_PASSWORD
+        self.opcd, self.password = credential or (AEON_OPCD, AEON_PASSWORD)
+        self.download_dir = download_dir  # None 表示使用浏览器默认下载目录
         self.driver = None
+        self.profile_slot = None
+        self.timings = {}  # 各步骤耗时（秒），用于比较精简模式前后的页面加载时间
+        self.submitted = False  # 已点击执行、文件已提交给门户（此后失败不能重传，以免重复下单）
         
+    @classmethod
+    def prewarm(cls):
+        """
+        提前启动一个浏览器，供下一次 run 直接使用（已有预热浏览器时不重复启动）
+        """
+        global _warm_driver
+        with _warm_lock:
+            if _warm_driver is not None:
+                return
+        uploader = cls()
+        driver = uploader._start_browser()
+        with _warm_lock:
+            if _warm_driver is None:
+                _warm_driver = (driver, uploader.profile_slot)
+                return
+        _quit_driver(driver)
+        if uploader.profile_slot is not None:
+            _release_profile_slot(uploader.profile_slot)
+
     def setup_browser(self):
+        if not self.download_dir:
+            warm = _take_warm_driver()
+            if warm:
+                self.driver, self.profile_slot = warm
+                return
+        self.driver = self._start_browser()
+
+    def _start_browser(self):
         options = Options()
         options.binary_location = self.chrome_path
         options.add_argument("--disable-popup-blocking")
-        options.add_argument("--start-maximized")
         options.add_argument("--headless")
         options.add_argument("--disable-gpu")
         options.add_argument('--no-sandbox')
         options.add_argument('--disable-dev-shm-usage')
 
+        prefs = {}
+        if self.download_dir:
+            prefs["download.default_directory"] = self.download_dir
+            prefs["download.prompt_for_download"] = False
+
+        if BROWSER_LEAN_MODE:
+            # 固定的小窗口，Ext JS 表格不必按最大化尺寸渲染
+            options.add_argument(f"--window-size={BROWSER_WINDOW_SIZE}")
+            # 可复用的精简 profile：保留缓存，跳过首次运行、扩展、同步等
+            self.profile_slot = _acquire_profile_slot()
+            options.add_argument(f"--user-data-dir={os.path.join(BROWSER_PROFILE_DIR, str(self.profile_slot))}")
+            options.add_argument("--no-first-run")
+            options.add_argument("--no-default-browser-check")
+            options.add_argument("--disable-extensions")
+            options.add_argument("--disable-sync")
+            options.add_argument("--disable-background-networking")
+            options.add_argument("--disable-component-update")
+            prefs["profile.managed_default_content_settings.images"] = 2
+        else:
+            options.add_argument("--start-maximized")
+
+        if prefs:
+            options.add_experimental_option("prefs", prefs)
+
         service = Service(self.driver_path)
-        self.driver = webdriver.Chrome(service=service, options=options)
+        try:
+            driver = webdriver.Chrome(service=service, options=options)
+        except Exception:
+            # 启动中途失败时 chromedriver 可能已经运行，直接结束其进程树
+            if getattr(service, "process", None):
+                kill_process_tree(service.process.pid)
+            if self.profile_slot is not None:
+                _release_profile_slot(self.profile_slot)
+                self.profile_slot = None
+            raise
+        track_browser_pid(service.process.pid)
+
+        if BROWSER_LEAN_MODE:
+            _block_resources(driver)
+        return driver
+
+    @contextmanager
+    def _step(self, name):
+        """记录一个步骤的耗时到 self.timings"""
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = round(perf_counter() - start, 2)
 
     def login(self):
         self.driver.get("1")
@@ -43,6 +209,8 @@ class AeonUploader:
         ).click()
 
         self.driver.switch_to.window(self.driver.window_handles[1])
+        if BROWSER_LEAN_MODE:
+            _block_resources(self.driver)  # 上传页面在新标签页中打开
 
         WebDriverWait(self.driver, 10).until(
             EC.element_to_be_clickable((By.ID, "button-1041-btnIconEl"))
@@ -61,6 +229,7 @@ class AeonUploader:
     def upload_file(self, file_path):
 
         self.driver.find_element(By.ID, "filefield-1495-button-fileInputEl").send_keys(file_path)
+        self.submitted = True
         self.driver.find_element(By.ID, "ext-comp-1483cmdExec-btnIconEl").click()
 
         WebDriverWait(self.driver, 10).until(
@@ -128,32 +297,43 @@ class AeonUploader:
 
 
     def run(self, file_path):
+        self.timings = {}
+        self.submitted = False
         try:
-            self.setup_browser()
-            self.login()
+            with self._step("setup_browser"):
+                self.setup_browser()
+            with self._step("login"):
+                self.login()
             # sleep(1000)
-            self.navigate_to_upload_page()
+            with self._step("navigate"):
+                self.navigate_to_upload_page()
 
-            result = self.upload_file(file_path)
+            with self._step("upload"):
+                result = self.upload_file(file_path)
             if result.get("error") == "inputEl":
                 sleep(5)
             
-                return {"success": False, "inputEl": True,"error": "err_list"}
+                return {"success": False, "inputEl": True,"error": "err_list", "timings": self.timings}
                 
-            self.extract_results()
-            return {"success": True, "result": "pass"}
+            with self._step("extract"):
+                self.extract_results()
+            return {"success": True, "result": "pass", "timings": self.timings}
 
         except Exception as e:
-            return {"success": False, "error": str(e)}
+            return {"success": False, "error": str(e), "submitted": self.submitted, "timings": self.timings}
         
         finally:
-
+            print("⏱ 各步骤耗时:", ", ".join(f"{k} {v}s" for k, v in self.timings.items()))
             self.close()
     
     def close(self):
         if self.driver:
-            self.driver.quit()
+            _quit_driver(self.driver)
+            self.driver = None
             print("✅ 浏览器已关闭")
         else:
             print("⚠️ 浏览器未正常启动，无需关闭")
+        if self.profile_slot is not None:
+            _release_profile_slot(self.profile_slot)
+            self.profile_slot = None
 
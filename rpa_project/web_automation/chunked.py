@@ -0,0 +1,69 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from excel_handler.utils import get_latest_file
+from settings import UPLOAD_PARALLEL_SESSIONS
+
+
+def upload_chunks(chunk_paths, work_dir, parallel=UPLOAD_PARALLEL_SESSIONS):
+    """
+    依次（或用多个会话并行）上传分批文件，实际并发数由 RateController 控制。
+    每批使用独立的下载目录，避免多个会话的発注番号 CSV 互相混淆。
+
+    参数:
+        chunk_paths (list[str]): 分批上传文件路径
+        work_dir (str): 作业文件夹，下载目录建在其中
+        parallel (int): 并发会话数上限
+
+    返回:
+        list[dict]: 每批的结果，包含 chunk、file_path、download_dir、success、inputEl、submitted、error、csv_path
+    """
+    jobs = list(enumerate(chunk_paths, start=1))
+
+    if parallel <= 1 or len(jobs) <= 1:
+        return [_upload_one(i, path, work_dir) for i, path in jobs]
+
+    with ThreadPoolExecutor(max_workers=parallel) as executor:
+        return list(executor.map(lambda job: _upload_one(job[0], job[1], work_dir), jobs))
+
+
+def _upload_one(index, file_path, work_dir):
+    download_dir = os.path.join(work_dir, f"downloads_{index:03d}")
+    os.makedirs(download_dir, exist_ok=True)
+
+    from web_automation.rate_control import get_rate_controller
+
+    print(f"📤 开始上传第 {index} 批: {os.path.basename(file_path)}")
+    result = get_rate_controller().run(file_path, download_dir=download_dir)
+
+    chunk_result = {
+        "chunk": index,
+        "file_path": file_path,
+        "download_dir": download_dir,
+        "success": result.get("success", False),
+        "inputEl": result.get("inputEl", False),
+        "submitted": result.get("submitted", False),
+        "error": result.get("error", ""),
+        "csv_path": None,
+    }
+    # 成功时下载的是発注番号 CSV，inputEl 时下载的是错误清单
+    if chunk_result["success"] or chunk_result["inputEl"]:
+        chunk_result["csv_path"] = get_latest_file(download_dir)
+    return chunk_result
+
+
+def summarize_chunk_results(chunk_results):
+    """
+    将各批结果汇总为与 AeonUploader.run 相同格式的结果字典
+
+    返回:
+        dict: 全部成功时 success 为 True；任一批 inputEl 时 inputEl 为 True
+    """
+    failed = [r for r in chunk_results if not r["success"]]
+    if not failed:
+        return {"success": True, "result": "pass"}
+
+    return {
+        "success": False,
+        "inputEl": any(r["inputEl"] for r in failed),
+        "error": "; ".join(f"第{r['chunk']}批:{r['error']}" for r in failed),
+    }
@@ -0,0 +1,193 @@
+# http_uploader.py
+import http.client
+import json
+import os
+import uuid
+from datetime import datetime
+from http.cookies import SimpleCookie
+from urllib.parse import urlencode, urlsplit
+from settings import (AEON_OPCD, AEON_PASSWORD, AEON_PORTAL_URL, DOWNLOADS_PATH, HTTP_TIMEOUT,
+                      HTTP_LOGIN_PATH, HTTP_UPLOAD_PATH, HTTP_SELECT_PATH, HTTP_EXPORT_PATH)
+
+
+class PortalHttpError(Exception):
+    """门户返回了非预期的 HTTP 状态或内容"""
+
+
+class HttpSession:
+    def __init__(self, base_url, timeout=HTTP_TIMEOUT):
+        """
+        简单的 keep-alive HTTP 会话：同一主机复用一个连接，并自动携带 Cookie
+
+        参数:
+            base_url (str): 门户根地址，例如 "https://example.com"
+            timeout (int): 单次请求超时（秒）
+        """
+        parts = urlsplit(base_url)
+        self.scheme = parts.scheme
+        self.host = parts.hostname
+        self.port = parts.port
+        self.base_path = parts.path.rstrip("/")
+        self.timeout = timeout
+        self.cookies = {}
+        self._conn = None
+        self._conn_reused = False
+
+    def request(self, method, path, body=None, headers=None):
+        """
+        发送请求并返回 (状态码, 响应头, 响应体)。
+        复用的空闲连接已被服务器关闭时重连一次；新建的连接失败则直接抛出，避免重复提交
+        """
+        headers = dict(headers or {})
+        if self.cookies:
+            headers["Cookie"] = "; ".join(f"{k}={v}" for k, v in self.cookies.items())
+
+        while True:
+            conn = self._connection()
+            reused = self._conn_reused
+            try:
+                conn.request(method, self.base_path + path, body=body, headers=headers)
+                resp = conn.getresponse()
+                data = resp.read()
+                self._conn_reused = True
+                break
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                self.close()
+                if not reused:
+                    raise
+
+        for header in resp.headers.get_all("Set-Cookie") or []:
+            cookie = SimpleCookie()
+            cookie.load(header)
+            self.cookies.update({k: m.value for k, m in cookie.items()})
+        return resp.status, resp.headers, data
+
+    def post_form(self, path, fields):
+        return self.request("POST", path, urlencode(fields).encode("utf-8"),
+                            {"Content-Type": "application/x-www-form-urlencoded"})
+
+    def post_json(self, path, payload):
+        return self.request("POST", path, json.dumps(payload).encode("utf-8"),
+                            {"Content-Type": "application/json"})
+
+    def post_file(self, path, field_name, file_path):
+        boundary = uuid.uuid4().hex
+        with open(file_path, "rb") as f:
+            content = f.read()
+        body = b"".join([
+            f"--{boundary}\r\n".encode(),
+            f'Content-Disposition: form-data; name="{field_name}"; '
+            f'filename="{os.path.basename(file_path)}"\r\n'.encode("utf-8"),
+            b"Content-Type: application/vnd.openxmlformats-officedocument.spreadsheetml.sheet\r\n\r\n",
+            content,
+            f"\r\n--{boundary}--\r\n".encode(),
+        ])
+        return self.request("POST", path, body, {"Content-Type": f"multipart/form-data; boundary={boundary}"})
+
+    def close(self):
+        if self._conn:
+            self._conn.close()
+            self._conn = None
+        self._conn_reused = False
+
+    def _connection(self):
+        if self._conn is None:
+            cls = http.client.HTTPSConnection if self.scheme == "https" else http.client.HTTPConnection
+            self._conn = cls(self.host, self.port, timeout=self.timeout)
+        return self._conn
+
+
+class AeonHttpUploader:
+    def __init__(self, download_dir=None, base_url=AEON_PORTAL_URL, credential=None):
+        """
+        不启动浏览器，直接重放门户的 HTTP 请求完成上传：
+        登录（OPCD/PSWD）→ 上传文件 → 勾选全部结果 → 导出发注番号 CSV
+
+        参数:
+            download_dir (str, optional): CSV 保存目录，默认与浏览器相同的下载文件夹
+            base_url (str): 门户根地址（可指向本地的模拟服务器进行测试）
+            credential (tuple, optional): (OPCD, PSWD)，默认使用 settings 中的账号
+        """
+        self.base_url = base_url
+        self.download_dir = download_dir or DOWNLOADS_PATH
+        self.opcd, self.password = credential or (AEON_OPCD, AEON_PASSWORD)
+        self.session = None
+        self.upload_started = False  # 登录成功、开始发送文件后为 True（此后失败不能回退到浏览器重传，以免重复下单）
+
+    def login(self):
+        status, _, data = self.session.post_form(HTTP_LOGIN_PATH, {"OPCD": self.opcd, "PSWD": self.password})
+        if status >= 400 or not self.session.cookies:
+            raise PortalHttpError(f"登录失败: HTTP {status}")
+
+    def upload_file(self, file_path):
+        """
+        返回:
+            dict: 门户返回的 JSON（success 为 False 时 errors 中为输入错误清单）
+        """
+        status, _, data = self.session.post_file(HTTP_UPLOAD_PATH, "file", file_path)
+        if status >= 400:
+            raise PortalHttpError(f"上传失败: HTTP {status}")
+        return json.loads(data.decode("utf-8"))
+
+    def extract_results(self, rows):
+        """
+        勾选上传结果的全部行并导出 CSV，返回保存路径
+        """
+        ids = [row["id"] for row in rows]
+        status, _, _ = self.session.post_json(HTTP_SELECT_PATH, {"ids": ids})
+        if status >= 400:
+            raise PortalHttpError(f"勾选失败: HTTP {status}")
+
+        status, headers, data = self.session.post_form(HTTP_EXPORT_PATH, {"format": "CSV"})
+        if status >= 400:
+            raise PortalHttpError(f"CSV 导出失败: HTTP {status}")
+        return self._save_download(headers, data)
+
+    def run(self, file_path):
+        self.session = HttpSession(self.base_url)
+        self.upload_started = False
+        try:
+            self.login()
+            self.upload_started = True
+            result = self.upload_file(file_path)
+            if not result.get("success"):
+                # 与浏览器版一致：把错误清单保存到下载目录，由 manager 移入作业文件夹
+                errors = result.get("errors", [])
+                self._save_error_list(errors)
+                return {"success": False, "inputEl": True, "error": "err_list"}
+
+            self.extract_results(result.get("rows", []))
+            return {"success": True, "result": "pass"}
+
+        except Exception as e:
+            return {"success": False, "error": str(e), "submitted": self.upload_started}
+
+        finally:
+            self.close()
+
+    def close(self):
+        if self.session:
+            self.session.close()
+            self.session = None
+
+    def _save_download(self, headers, data):
+        filename = None
+        disposition = headers.get("Content-Disposition", "")
+        if "filename=" in disposition:
+            filename = os.path.basename(disposition.split("filename=")[-1].strip('"; '))
+        if not filename:
+            filename = f"hacchu_{datetime.now().strftime('%Y%m%d%H%M%S')}.csv"
+
+        os.makedirs(self.download_dir, exist_ok=True)
+        save_path = os.path.join(self.download_dir, filename)
+        with open(save_path, "wb") as f:
+            f.write(data)
+        return save_path
+
+    def _save_error_list(self, errors):
+        lines = ["行,内容"] + [f"{e.get('row', '')},{e.get('message', '')}" for e in errors]
+        os.makedirs(self.download_dir, exist_ok=True)
+        save_path = os.path.join(self.download_dir, f"err_list_{datetime.now().strftime('%Y%m%d%H%M%S')}.csv")
+        with open(save_path, "w", encoding="cp932", errors="replace", newline="") as f:
+            f.write("\r\n".join(lines) + "\r\n")
+        return save_path
@@ -0,0 +1,160 @@
+# mock_portal.py
+"""
+本地模拟门户：实现 AeonHttpUploader 使用的 4 个接口，用于在不访问真实门户的情况下测试 HTTP 上传后端。
+上传的流しデータ中每一行都会分配一个発注番号，导出的 CSV 与门户下载的发注番号 CSV 格式相同（cp932）。
+
+用法:
+    python -m web_automation.mock_portal [端口] [--errors]
+    然后把 settings.AEON_PORTAL_URL 设为 "http://127.0.0.1:<端口>"、UPLOAD_BACKEND 设为 "http"、
+    HTTP_ENDPOINTS_CONFIRMED 设为 True（只在测试环境中）。
+    接口和响应格式与 settings 中的占位定义一致，不代表真实门户的行为。
+    --errors: 上传接口始终返回输入错误清单（对应浏览器版的 inputEl）
+"""
+import csv
+import io
+import json
+import sys
+import uuid
+from datetime import datetime
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import parse_qs
+from settings import (HTTP_LOGIN_PATH, HTTP_UPLOAD_PATH, HTTP_SELECT_PATH, HTTP_EXPORT_PATH,
+                      KEY_COLUMNS_IN_B, VALUE_COLUMN_IN_B)
+
+SESSION_COOKIE = "JSESSIONID"
+
+
+class MockPortal:
+    def __init__(self, input_errors=False):
+        """
+        模拟门户的状态：会话、上传结果和勾选的行
+
+        参数:
+            input_errors (bool): 为 True 时上传接口始终返回输入错误清单
+        """
+        self.input_errors = input_errors
+        self.sessions = set()
+        self.rows = {}  # {行 id: 导出 CSV 的一行}
+        self.selected = []
+        self.next_number = 1
+
+    def register_upload(self, content):
+        """
+        读取上传的 xlsx，为每一行分配発注番号
+
+        返回:
+            list[dict]: [{"id": 行 id}, ...]
+        """
+        from openpyxl import load_workbook
+
+        sheet = load_workbook(io.BytesIO(content), read_only=True).active
+        rows = sheet.iter_rows(values_only=True)
+        headers = [str(h) if h is not None else "" for h in next(rows, [])]
+        uploaded = []
+        for values in rows:
+            record = dict(zip(headers, values))
+            row_id = uuid.uuid4().hex[:12]
+            line = {col: "" if record.get(col) is None else str(record[col]) for col in KEY_COLUMNS_IN_B}
+            line["指定納期"] = line["指定納期"].replace("/", "")  # 门户导出的日期为 yyyymmdd
+            line[VALUE_COLUMN_IN_B] = f"{self.next_number:010d}"
+            self.next_number += 1
+            self.rows[row_id] = line
+            uploaded.append({"id": row_id})
+        return uploaded
+
+    def export_csv(self):
+        """
+        返回:
+            bytes: 勾选行的发注番号 CSV（cp932）
+        """
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=KEY_COLUMNS_IN_B + [VALUE_COLUMN_IN_B], lineterminator="\r\n")
+        writer.writeheader()
+        for row_id in self.selected:
+            if row_id in self.rows:
+                writer.writerow(self.rows[row_id])
+        return buffer.getvalue().encode("cp932", errors="replace")
+
+
+class _PortalHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # 与门户一样保持连接，测试 HttpSession 的连接复用
+    portal = None  # 由 serve() 设置
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.path == HTTP_LOGIN_PATH:
+            return self._login(body)
+        if not self._logged_in():
+            return self._send(401, b"not logged in")
+        if self.path == HTTP_UPLOAD_PATH:
+            return self._upload(body)
+        if self.path == HTTP_SELECT_PATH:
+            self.portal.selected = json.loads(body.decode("utf-8")).get("ids", [])
+            return self._send_json(200, {"success": True, "selected": len(self.portal.selected)})
+        if self.path == HTTP_EXPORT_PATH:
+            filename = f"hacchu_{datetime.now().strftime('%Y%m%d%H%M%S')}.csv"
+            return self._send(200, self.portal.export_csv(), "text/csv",
+                              {"Content-Disposition": f'attachment; filename="{filename}"'})
+        self._send(404, b"not found")
+
+    def log_message(self, format, *args):
+        print(f"🧪 {self.command} {self.path}")
+
+    def _login(self, body):
+        fields = parse_qs(body.decode("utf-8"))
+        if not fields.get("OPCD") or not fields.get("PSWD"):
+            return self._send(403, b"login failed")
+        session_id = uuid.uuid4().hex
+        self.portal.sessions.add(session_id)
+        self._send(200, b"ok", headers={"Set-Cookie": f"{SESSION_COOKIE}={session_id}; Path=/"})
+
+    def _logged_in(self):
+        for part in self.headers.get("Cookie", "").split(";"):
+            name, _, value = part.strip().partition("=")
+            if name == SESSION_COOKIE and value in self.portal.sessions:
+                return True
+        return False
+
+    def _upload(self, body):
+        message = BytesParser(policy=HTTP).parsebytes(
+            f"Content-Type: {self.headers.get('Content-Type', '')}\r\n\r\n".encode("utf-8") + body)
+        files = [part for part in message.iter_parts() if part.get_param("name", header="content-disposition") == "file"]
+        if not files:
+            return self._send_json(400, {"success": False, "errors": [{"row": "", "message": "file がありません"}]})
+        if self.portal.input_errors:
+            return self._send_json(200, {"success": False, "errors": [{"row": 2, "message": "商品コードが存在しません"}]})
+        rows = self.portal.register_upload(files[0].get_payload(decode=True))
+        self._send_json(200, {"success": True, "rows": rows})
+
+    def _send_json(self, status, payload):
+        self._send(status, json.dumps(payload, ensure_ascii=False).encode("utf-8"), "application/json; charset=utf-8")
+
+    def _send(self, status, data, content_type="text/plain; charset=utf-8", headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def serve(port=8080, input_errors=False):
+    """
+    启动模拟门户（仅监听本机）
+    """
+    _PortalHandler.portal = MockPortal(input_errors)
+    server = HTTPServer(("127.0.0.1", port), _PortalHandler)
+    print(f"🧪 模拟门户已启动: http://127.0.0.1:{port}")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    ports = [int(a) for a in args if a.isdigit()]
+    serve(ports[0] if ports else 8080, input_errors="--errors" in args)
@@ -0,0 +1,118 @@
+# rate_control.py
+import threading
+from contextlib import contextmanager
+from time import perf_counter, sleep
+from ledger.log import log_event
+from settings import (AEON_CREDENTIALS, UPLOAD_PARALLEL_SESSIONS, RATE_TARGET_LATENCY,
+                      RATE_MIN_START_INTERVAL, LOG_PATH)
+
+
+class RateController:
+    def __init__(self, credentials=AEON_CREDENTIALS, max_concurrency=UPLOAD_PARALLEL_SESSIONS,
+                 target_latency=RATE_TARGET_LATENCY, min_start_interval=RATE_MIN_START_INTERVAL):
+        """
+        放在 uploader.run 前面的并发与速率控制（AIMD）：
+        - 上传成功且耗时低于 target_latency 时，并发上限 +1
+        - 出错、超时或耗时过长时，并发上限减半（最低为 1）
+        - inputEl（数据错误）说明门户正常响应，不调整
+        每个会话独占一个操作员账号，并发上限不超过账号数。
+
+        参数:
+            credentials (list[tuple]): [(OPCD, PSWD), ...]
+            max_concurrency (int): 并发上限的最大值
+            target_latency (float): 单次上传的目标耗时（秒）
+            min_start_interval (float): 两次会话启动之间的最小间隔（秒）
+        """
+        self.credentials = list(credentials)
+        self.max_limit = max(1, min(max_concurrency, len(self.credentials)))
+        self.target_latency = target_latency
+        self.min_start_interval = min_start_interval
+        self.limit = 1
+        self.active = 0
+        self.successes = 0
+        self.errors = 0
+        self.last_latency = None
+        self._free = list(self.credentials)
+        self._last_start = 0.0
+        self._cond = threading.Condition()
+
+    def run(self, file_path, download_dir=None):
+        """
+        在并发上限内执行一次上传，返回 uploader.run 的结果
+        """
+        from web_automation.uploader import create_uploader
+
+        with self._slot() as credential:
+            start = perf_counter()
+            result = create_uploader(download_dir=download_dir, credential=credential).run(file_path)
+            self._observe(result, perf_counter() - start)
+        return result
+
+    def metrics(self):
+        """
+        返回:
+            dict: 当前并发上限、运行中的会话数及累计结果
+        """
+        with self._cond:
+            return {
+                "limit": self.limit,
+                "max_limit": self.max_limit,
+                "active": self.active,
+                "successes": self.successes,
+                "errors": self.errors,
+                "last_latency": self.last_latency,
+            }
+
+    @contextmanager
+    def _slot(self):
+        with self._cond:
+            while self.active >= self.limit or not self._free:
+                self._cond.wait()
+            self.active += 1
+            credential = self._free.pop(0)
+            wait = self._last_start + self.min_start_interval - perf_counter()
+            self._last_start = perf_counter() + max(wait, 0)
+        if wait > 0:
+            sleep(wait)
+        try:
+            yield credential
+        finally:
+            with self._cond:
+                self.active -= 1
+                self._free.append(credential)
+                self._cond.notify_all()
+
+    def _observe(self, result, latency):
+        with self._cond:
+            old_limit = self.limit
+            self.last_latency = round(latency, 1)
+            if result.get("success"):
+                self.successes += 1
+                if latency <= self.target_latency:
+                    self.limit = min(self.limit + 1, self.max_limit)
+                else:
+                    self.limit = max(1, self.limit // 2)
+            elif not result.get("inputEl"):
+                self.errors += 1
+                self.limit = max(1, self.limit // 2)
+            new_limit = self.limit
+            self._cond.notify_all()
+
+        if new_limit != old_limit:
+            print(f"🚦 上传并发上限 {old_limit} → {new_limit}（耗时 {latency:.1f}s）")
+            log_event(LOG_PATH, "rate_limit", f"limit={new_limit} previous={old_limit} latency={latency:.1f}")
+
+
+_controller = None
+_controller_lock = threading.Lock()
+
+
+def get_rate_controller():
+    """
+    返回进程内共用的 RateController（并发上限在多个文件之间延续）
+    """
+    global _controller
+    with _controller_lock:
+        if _controller is None:
+            _controller = RateController()
+        return _controller
@@ -0,0 +1,41 @@
+# uploader.py
+from settings import UPLOAD_BACKEND, HTTP_ENDPOINTS_CONFIRMED
+
+
+class FallbackUploader:
+    def __init__(self, download_dir=None, credential=None):
+        """
+        先用 HTTP 后端上传；开始发送文件之前（登录、连接阶段）失败时，改用浏览器重新执行
+
+        参数:
+            download_dir (str, optional): CSV 下载目录
+            credential (tuple, optional): (OPCD, PSWD)
+        """
+        self.download_dir = download_dir
+        self.credential = credential
+
+    def run(self, file_path):
+        from web_automation.http_uploader import AeonHttpUploader
+
+        http_uploader = AeonHttpUploader(download_dir=self.download_dir, credential=self.credential)
+        result = http_uploader.run(file_path)
+        if result["success"] or result.get("inputEl") or result.get("submitted"):
+            return result
+
+        print(f"⚠️ HTTP 上传失败，改用浏览器: {result.get('error')}")
+        from web_automation.automator import AeonUploader
+        return AeonUploader(download_dir=self.download_dir, credential=self.credential).run(file_path)
+
+
+def create_uploader(download_dir=None, credential=None):
+    """
+    根据 settings.UPLOAD_BACKEND 返回上传器，接口均为 run(file_path) -> dict。
+    HTTP 接口未确认（HTTP_ENDPOINTS_CONFIRMED 为 False）时始终使用浏览器
+    """
+    if UPLOAD_BACKEND == "http":
+        if HTTP_ENDPOINTS_CONFIRMED:
+            return FallbackUploader(download_dir, credential)
+        print("⚠️ HTTP 上传接口尚未与门户核对（HTTP_ENDPOINTS_CONFIRMED = False），使用浏览器上传")
+
+    from web_automation.automator import AeonUploader
+    return AeonUploader(download_dir=download_dir, credential=credential)